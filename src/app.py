@@ -1,16 +1,19 @@
+import io
+
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
-import json
-from shapely.geometry import Point
 import folium
 from folium.plugins import HeatMap, Geocoder
 from streamlit_folium import st_folium
-from geopy.distance import geodesic
-import os
 
-# Get the project root directory
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+from orion.config import YEARS, MAP_CENTER, MAP_ZOOM, DARK_SKY_THRESHOLD, INDIA_BOUNDS
+from orion.coverage import WEIGHTINGS, point_weights
+from orion.viirs import load_year, viirs_path, year_index
+from orion.interpolate import IDW_NEIGHBOURS
+from orion.aggregate import AggregatePyramid, snap_bounds
+from orion.suitability import read_sites, score_sites, score_year
+from orion.raster import load_raster, NO_DATA
+from orion.models import load_model
 
 # ----------------------------
 # Configuration
@@ -19,68 +22,90 @@ st.set_page_config(layout="wide")
 st.title("💡 Live Light Pollution Heatmap (2014–2023)")
 st.markdown("🛰️ Explore India's light pollution using VIIRS satellite data. Also check observation suitability by location.")
 
-DARK_SKY_THRESHOLD = 3.0  # Radiance above this is considered unsuitable
-
 # ----------------------------
 # Year Selector
 # ----------------------------
-years = list(range(2014, 2024))
+years = YEARS
 year = st.selectbox("📅 Select Year", years, index=len(years) - 1)
+# 'coverage' weights samples by their cloud-free observation count (cf_cvg) in the heatmap
+# cells and the interpolated estimates
+weighting = st.radio("⚖️ Sample weighting", WEIGHTINGS, horizontal=True)
 
 # ----------------------------
-# Load CSV
+# Load Data
 # ----------------------------
-csv_path = os.path.join(project_root, "src", "data", "viirs", f"VIIRS_India_{year}.csv")
-try:
-    df = pd.read_csv(csv_path)
-except FileNotFoundError:
-    st.error(f"CSV file not found: {csv_path}")
+@st.cache_data
+def load_points(year, weighting='equal'):
+    try:
+        points = load_year(year, coverage=weighting != 'equal')
+    except FileNotFoundError:
+        return None
+
+    # Normalize brightness
+    points = points[points['avg_rad'] > 0].copy()
+    points['norm_rad'] = points['avg_rad'] / points['avg_rad'].max()
+    if weighting != 'equal':
+        points['sample_weight'] = point_weights(points['cf_cvg'].to_numpy(), weighting)
+    return points
+
+@st.cache_resource
+def load_pyramid(year, weighting='equal'):
+    points = load_points(year, weighting)
+    sample_weights = points['sample_weight'] if weighting != 'equal' else None
+    return AggregatePyramid(points['Latitude'], points['Longitude'], points['norm_rad'],
+                            sample_weights=sample_weights)
+
+@st.cache_data(max_entries=256)
+def viewport_heat_data(year, weighting, bounds, zoom):
+    return load_pyramid(year, weighting).heat_data(bounds, zoom)
+
+gdf = load_points(year, weighting)
+if gdf is None:
+    st.error(f"CSV file not found: {viirs_path(year)}")
     st.stop()
 
-# Extract lat/lon from `.geo`
-def extract_coords(geo_str):
-    geo_json = json.loads(geo_str)
-    lon, lat = geo_json["coordinates"]
-    return pd.Series([lat, lon])
-
-df[['Latitude', 'Longitude']] = df['.geo'].apply(extract_coords)
-
-# Convert to GeoDataFrame
-gdf = gpd.GeoDataFrame(
-    df,
-    geometry=gpd.points_from_xy(df['Longitude'], df['Latitude']),
-    crs="EPSG:4326"
-)
-
-# Clip to India boundary
-india = gpd.read_file(os.path.join(project_root, "src", "data", "boundaries", "india_boundary.geojson"))
-gdf = gpd.sjoin(gdf, india, predicate='within')
-
-# Normalize brightness
-gdf = gdf[gdf['avg_rad'] > 0].copy()
-gdf['norm_rad'] = gdf['avg_rad'] / gdf['avg_rad'].max()
-
-# Prepare heatmap data
-heat_data = [[row['Latitude'], row['Longitude'], row['norm_rad']] for idx, row in gdf.iterrows()]
-st.write(f"🟢 Heatmap data points: {len(heat_data)}")
-
 # ----------------------------
-# Create Base Map
+# Current Viewport
 # ----------------------------
+# st_folium keeps the last reported view under its key; only grid cells inside it are sent
+view = st.session_state.get("heatmap") or {}
+zoom = view.get("zoom") or MAP_ZOOM
+center = view.get("center") or {"lat": MAP_CENTER[0], "lng": MAP_CENTER[1]}
+bounds = view.get("bounds") or {}
+if bounds.get("_southWest") and bounds.get("_northEast"):
+    viewport = (bounds["_southWest"]["lat"], bounds["_southWest"]["lng"],
+                bounds["_northEast"]["lat"], bounds["_northEast"]["lng"])
+else:
+    viewport = INDIA_BOUNDS
+
+heat_bounds = snap_bounds(viewport, zoom)
+heat_data = viewport_heat_data(year, weighting, heat_bounds, zoom)
+st.write(f"🟢 Heatmap data points: {len(gdf)} ({len(heat_data)} grid cells in view)")
+
 # ----------------------------
-# Create Base Map First (no render yet)
+# Create Base Map (cached, no render yet)
 # ----------------------------
-m = folium.Map(location=[22.9734, 78.6569], zoom_start=5, tiles='CartoDB dark_matter')
-Geocoder(collapsed=False).add_to(m)
-
-# Add heatmap layer
-HeatMap(
-    heat_data,
-    radius=15,
-    blur=10,
-    min_opacity=0.3,
-    max_zoom=6
-).add_to(m)
+# Reusing the same map object keeps its HTML identical between reruns, so st_folium
+# only pushes the marker overlay instead of re-sending the whole heatmap
+@st.cache_resource(max_entries=64)
+def build_base_map(year, weighting, heat_bounds, zoom):
+    south, west, north, east = heat_bounds
+    m = folium.Map(location=[(south + north) / 2, (west + east) / 2], zoom_start=zoom,
+                   tiles='CartoDB dark_matter')
+    Geocoder(collapsed=False).add_to(m)
+
+    # Add heatmap layer
+    HeatMap(
+        viewport_heat_data(year, weighting, heat_bounds, zoom),
+        radius=15,
+        blur=10,
+        min_opacity=0.3,
+        max_zoom=6
+    ).add_to(m)
+    return m
+
+m = build_base_map(year, weighting, heat_bounds, zoom)
+markers = folium.FeatureGroup(name="Checked locations")
 
 # ----------------------------
 # Suitability Check Block
@@ -90,23 +115,31 @@ st.markdown("### 🔍 Check Light Pollution Suitability at a Location")
 lat = st.number_input("Latitude", value=28.6139, format="%.6f")
 lon = st.number_input("Longitude", value=77.2090, format="%.6f")
 
-def get_nearest_viirs_value(lat, lon, gdf):
-    from geopy.distance import geodesic
-    min_dist = float('inf')
-    nearest_value = None
-    for _, row in gdf.iterrows():
-        dist = geodesic((lat, lon), (row['Latitude'], row['Longitude'])).meters
-        if dist < min_dist:
-            min_dist = dist
-            nearest_value = row['avg_rad']
-    return nearest_value, min_dist
+estimate = st.radio("Radiance estimate", ["Nearest sample", "Interpolated (IDW)"], horizontal=True)
 
 # Handle button interaction
 if st.button("Check Pollution at Location"):
-    nearest_value, dist = get_nearest_viirs_value(lat, lon, gdf)
+    score = score_year([lat], [lon], year).iloc[0]
+    # No estimate for sites too far from every sample
+    radiance = None if pd.isna(score['avg_rad']) else float(score['avg_rad'])
+    support = f"**📍 Closest Data Point**: {score['distance_m']:.2f} meters away"
+    if radiance is not None and estimate == "Interpolated (IDW)":
+        # Read from the year's precomputed suitability raster instead of searching samples
+        raster_radiance, raster_class = load_raster(year, weighting=weighting).sample([lat], [lon])
+        if raster_class[0] != NO_DATA:
+            radiance = float(raster_radiance[0])
+            # The estimate blends several samples, so report all of them rather than the closest
+            distances, _ = year_index(year)[0].query([lat], [lon], k=IDW_NEIGHBOURS)
+            support = (f"**📍 Interpolation support**: inverse-distance weighted from the {IDW_NEIGHBOURS} "
+                       f"nearest samples, {distances.min() / 1000:.1f}–{distances.max() / 1000:.1f} km away")
+    st.session_state["checked_location"] = (year, lat, lon, radiance, support)
+
+checked = st.session_state.get("checked_location")
+if checked is not None and checked[0] == year:
+    _, checked_lat, checked_lon, nearest_value, support = checked
 
     if nearest_value is not None:
-        st.markdown(f"**📍 Closest Data Point**: {dist:.2f} meters away")
+        st.markdown(support)
         st.markdown(f"**💡 Radiance (avg_rad)**: `{nearest_value:.2f} nW/cm²/sr`")
 
         if nearest_value > DARK_SKY_THRESHOLD:
@@ -116,16 +149,84 @@ if st.button("Check Pollution at Location"):
 
         # ✅ Add marker with color based on suitability
         folium.Marker(
-            location=[lat, lon],
+            location=[checked_lat, checked_lon],
             popup=f"avg_rad: {nearest_value:.2f}",
             icon=folium.Icon(color="red" if nearest_value > DARK_SKY_THRESHOLD else "green")
-        ).add_to(m)
+        ).add_to(markers)
     else:
         st.warning("⚠️ No VIIRS data found near this location.")
 
+# ----------------------------
+# Forecast Lookup
+# ----------------------------
+st.markdown("### 🔮 Forecast Radiance at This Location")
+
+@st.cache_resource
+def forecast_model():
+    # Loaded once per server process; the booster stays warm between reruns
+    try:
+        return load_model()
+    except (FileNotFoundError, ImportError):
+        return None
+
+model = forecast_model()
+if model is None:
+    st.info("No trained model is available. Run `python -m orion.models import` from `src` to register one.")
+else:
+    # Horizon-dependent models only forecast as far ahead as they were trained for
+    last_year = min(max(years) + 6, model.last_forecast_year or max(years) + 6)
+    forecast_years = list(range(max(years) + 1, last_year + 1))
+    forecast_year = st.selectbox("Forecast year", forecast_years, index=min(1, len(forecast_years) - 1))
+    forecast = float(model.predict(lat, lon, forecast_year)[0])
+    st.markdown(f"**💡 Predicted radiance in {forecast_year}**: `{forecast:.2f} nW/cm²/sr`")
+    if forecast > DARK_SKY_THRESHOLD:
+        st.error(f"❌ Expected to be **unsuitable** for dark-sky observation in {forecast_year}.")
+    else:
+        st.success(f"✅ Expected to remain **suitable** for dark-sky observation in {forecast_year}.")
+    metrics = model.metadata.get('metrics', {})
+    if 'mae' in metrics:
+        st.caption(f"Model MAE {metrics['mae']:.2f} nW/cm²/sr over {metrics['samples']} samples "
+                   f"— {metrics['evaluated_on']}.")
+
+# ----------------------------
+# Batch Suitability Check
+# ----------------------------
+st.markdown("### 📂 Score Candidate Sites from a CSV")
+
+@st.cache_data(max_entries=16)
+def score_upload(data, years):
+    # Scored once per uploaded file and year list, not on every rerun
+    return score_sites(read_sites(io.BytesIO(data)), list(years))
+
+sites_file = st.file_uploader("Upload a CSV with latitude/longitude columns", type="csv")
+if sites_file is not None:
+    try:
+        sites = read_sites(io.BytesIO(sites_file.getvalue()))
+    except ValueError as e:
+        st.error(str(e))
+    else:
+        results = score_upload(sites_file.getvalue(), tuple(years))
+        st.write(f"🟢 Scored {len(sites)} sites against {len(years)} years")
+        st.dataframe(results[results['year'] == year], use_container_width=True)
+        st.download_button(
+            "Download all years",
+            results.to_csv(index=False),
+            file_name="site_suitability.csv",
+            mime="text/csv"
+        )
+
 # ----------------------------
 # Final: Render the map once at the end
 # ----------------------------
-st_folium(m, width=1100, height=650)
+st_folium(
+    m,
+    key="heatmap",
+    width=1100,
+    height=650,
+    center=(center["lat"], center["lng"]),
+    zoom=zoom,
+    feature_group_to_add=markers,
+    returned_objects=["bounds", "zoom", "center"]
+)
 
 # python -m streamlit run src/app.py
\ No newline at end of file
@@ -1,19 +1,25 @@
 // Define bounding box for India
 var india = ee.Geometry.Rectangle([68, 6, 97, 37]);
 
-// Load VIIRS ImageCollection
+// Load VIIRS ImageCollection with the cloud-free observation count of every pixel
 var viirsCollection = ee.ImageCollection("NOAA/VIIRS/DNB/MONTHLY_V1/VCMSLCFG")
-                       .select('avg_rad');
+                       .select(['avg_rad', 'cf_cvg']);
 
 // Function to export a single year
 function exportYearlyVIIRS(year) {
   var start = ee.Date.fromYMD(year, 1, 1);
   var end = start.advance(1, 'year');
 
-  // Get annual average image
-  var yearlyImage = viirsCollection
-                      .filterDate(start, end)
-                      .mean()
+  var months = viirsCollection.filterDate(start, end);
+
+  // Get annual average image, weighting each month by its cloud-free observations so that
+  // thinly observed months count less; cf_cvg is the year's total count
+  var weighted = months.map(function(image) {
+    return image.select('avg_rad').multiply(image.select('cf_cvg')).rename('avg_rad');
+  }).sum();
+  var coverage = months.select('cf_cvg').sum();
+  var yearlyImage = weighted.divide(coverage)
+                      .addBands(coverage)
                       .clip(india);
 
   // Sample random points
@@ -37,8 +43,42 @@ function exportYearlyVIIRS(year) {
   });
 }
 
+// Function to export every month of a year at the same points, two bands per month
+// (named <YYYYMMDD>_avg_rad and <YYYYMMDD>_cf_cvg), so seasonal and rolling aggregates
+// can be built locally
+function exportMonthlyVIIRS(year) {
+  var start = ee.Date.fromYMD(year, 1, 1);
+  var end = start.advance(1, 'year');
+
+  // Stack the monthly images as bands instead of averaging them
+  var monthlyImage = viirsCollection
+                       .filterDate(start, end)
+                       .toBands()
+                       .clip(india);
+
+  // Same points as the yearly export
+  var points = ee.FeatureCollection.randomPoints({
+    region: india,
+    points: 5000,
+    seed: year
+  });
+
+  var samples = monthlyImage.sampleRegions({
+    collection: points,
+    scale: 500,
+    geometries: true
+  });
+
+  Export.table.toDrive({
+    collection: samples,
+    description: 'VIIRS_India_monthly_' + year,
+    fileFormat: 'CSV'
+  });
+}
+
 // Loop through years and export
 var years = ee.List.sequence(2014, 2023);
 years.getInfo().forEach(function(y) {
   exportYearlyVIIRS(y);
+  exportMonthlyVIIRS(y);
 });
\ No newline at end of file
@@ -0,0 +1,101 @@
+import numpy as np
+
+# Leaflet renders 256px tiles, so one pixel spans 360 / (256 * 2**zoom) degrees.
+# Cells are sized to roughly CELL_PIXELS screen pixels at the zoom they serve.
+CELL_PIXELS = 8
+MIN_ZOOM = 3
+MAX_ZOOM = 12
+
+
+def cell_size(zoom):
+    return CELL_PIXELS * 360.0 / (256 * 2 ** zoom)
+
+
+class GridLevel:
+    # Points binned onto one regular lat/lon grid, sorted by (row, col).
+    # With sample_weights (e.g. cf_cvg counts) each cell's weight / count is the
+    # sample-weighted mean of its values rather than the plain one.
+
+    def __init__(self, lat, lon, weights, size, origin, sample_weights=None):
+        self.size = size
+        self.origin = origin
+        self.n_cols = int(np.ceil(360.0 / size)) + 1
+
+        rows = np.floor((lat - origin[0]) / size).astype(np.int64)
+        cols = np.floor((lon - origin[1]) / size).astype(np.int64)
+        keys = rows * self.n_cols + cols
+
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.count = np.bincount(inverse, minlength=len(self.keys))
+        self.weight = np.bincount(inverse, weights=weights, minlength=len(self.keys))
+        if sample_weights is not None:
+            sums = np.bincount(inverse, weights=weights * sample_weights, minlength=len(self.keys))
+            totals = np.bincount(inverse, weights=sample_weights, minlength=len(self.keys))
+            # Cells whose samples all carry zero weight keep their plain mean
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.weight = np.where(totals > 0, self.count * sums / totals, self.weight)
+
+        # Centroids keep cells where their points actually are
+        self.lat = np.bincount(inverse, weights=lat, minlength=len(self.keys)) / self.count
+        self.lon = np.bincount(inverse, weights=lon, minlength=len(self.keys)) / self.count
+
+    def query(self, south, west, north, east):
+        # Binary-search each grid row inside the viewport rather than scanning every cell
+        row0 = int(np.floor((south - self.origin[0]) / self.size))
+        row1 = int(np.floor((north - self.origin[0]) / self.size))
+        col0 = int(np.floor((west - self.origin[1]) / self.size))
+        col1 = int(np.floor((east - self.origin[1]) / self.size))
+
+        rows = np.arange(row0, row1 + 1, dtype=np.int64) * self.n_cols
+        starts = np.searchsorted(self.keys, rows + col0, side='left')
+        stops = np.searchsorted(self.keys, rows + col1, side='right')
+
+        lengths = stops - starts
+        if lengths.sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum())
+
+
+class AggregatePyramid:
+    # Multi-resolution grid aggregates of one year's points, one level per zoom
+
+    def __init__(self, lat, lon, weights, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, sample_weights=None):
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        if sample_weights is not None:
+            sample_weights = np.asarray(sample_weights, dtype=float)
+
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        origin = (-90.0, -180.0)
+        self.levels = {
+            zoom: GridLevel(lat, lon, weights, cell_size(zoom), origin, sample_weights)
+            for zoom in range(min_zoom, max_zoom + 1)
+        }
+
+    def level(self, zoom):
+        zoom = int(round(zoom))
+        return self.levels[min(max(zoom, self.min_zoom), self.max_zoom)]
+
+    def heat_data(self, bounds, zoom):
+        # Return [lat, lon, weight] rows for the cells visible in `bounds`
+        south, west, north, east = bounds
+        level = self.level(zoom)
+        idx = level.query(south, west, north, east)
+        return np.column_stack([level.lat[idx], level.lon[idx], level.weight[idx]]).tolist()
+
+
+def snap_bounds(bounds, zoom, pad=0.5):
+    # Pad the viewport and snap it to the level's cell grid so small pans reuse the same result
+    south, west, north, east = bounds
+    pad_lat = (north - south) * pad
+    pad_lon = (east - west) * pad
+    size = cell_size(zoom) * 4
+    return (
+        float(np.floor((south - pad_lat) / size) * size),
+        float(np.floor((west - pad_lon) / size) * size),
+        float(np.ceil((north + pad_lat) / size) * size),
+        float(np.ceil((east + pad_lon) / size) * size),
+    )
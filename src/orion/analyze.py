@@ -0,0 +1,146 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+from scipy import stats
+
+from orion import config
+from orion.coverage import WEIGHTINGS, add_weights, grouped_means
+from orion.difference import difference_grid
+from orion.export import submit_plotly, write_dashboard
+from orion.figures import correlation_figures, difference_map, regional_figure, trends_figure
+from orion.outlier_analysis import outlier_masks, write_outputs
+from orion.outliers import DETECTORS, compare_detectors
+from orion.regions import assign_regions
+from orion.render import RenderScheduler, add_render_arguments, save_folium
+from orion.viirs import load_panel
+from orion.worldbank import POPULATION_GROWTH, load_store
+
+# Radiance columns analysed side by side: raw samples and samples with outliers masked out
+SERIES = {'avg_rad': '', 'avg_rad_clean': '_clean'}
+
+
+def yearly_statistics(panel, column, weight_column=None, by=('Year',)):
+    # Statistics per year, or per time step `by` (e.g. ('Time', 'Period') of load_periods panels)
+    grouped = panel.groupby(list(by))[column]
+    yearly = grouped.agg(Mean_Radiance='mean', Median_Radiance='median', Max_Radiance='max',
+                         Total_Radiance='sum', Points='count').reset_index()
+    if weight_column:
+        # Weighted mean in place of the plain one; the other statistics stay per sample
+        yearly['Mean_Radiance'] = grouped_means(panel, list(by), column, weight_column)
+    yearly['Trimmed_Mean_5'] = grouped.apply(lambda v: stats.trim_mean(v.dropna(), 0.05)).to_numpy()
+    return yearly
+
+
+def regional_statistics(panel, column, weight_column=None, by=('Year',)):
+    keys = list(by) + ['Region']
+    regional = panel.groupby(keys)[column].agg(['mean', 'median', 'count']).reset_index()
+    if weight_column:
+        regional['mean'] = grouped_means(panel, keys, column, weight_column)
+    return regional
+
+
+def population_growth(country='IND', years=config.YEARS):
+    # Annual population growth (%) for one country from the World Bank store
+    growth = load_store().series(country, POPULATION_GROWTH, list(years))
+    return pd.DataFrame({'Year': list(years), 'Growth_Rate': growth.to_numpy()})
+
+
+def population_correlation(yearly, growth):
+    merged = pd.merge(growth, yearly[['Year', 'Mean_Radiance']], on='Year')
+    return merged, merged['Growth_Rate'].corr(merged['Mean_Radiance'])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute the outputs of the temporal, outlier and population correlation scripts "
+                    "from one data pass")
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS, help="Years to analyse")
+    parser.add_argument("--detector", choices=sorted(DETECTORS), default='iqr',
+                        help="Outlier detector used for the clean series")
+    parser.add_argument("--compare", nargs="+", choices=sorted(DETECTORS), default=[],
+                        help="Also tabulate how many points each of these detectors removes")
+    parser.add_argument("--weights", choices=WEIGHTINGS, default='equal',
+                        help="Weight means by each sample's cloud-free observation count (cf_cvg)")
+    parser.add_argument("-o", "--output-dir", default=config.analysis_dir, help="Where to write the outputs")
+    add_render_arguments(parser, default_formats='html,json')
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    scheduler = RenderScheduler(args.formats, args.workers)
+    timings = {}
+
+    def path(name):
+        return os.path.join(args.output_dir, name)
+
+    # Single data pass: every output below reuses this in-memory panel
+    start = time.perf_counter()
+    panel = load_panel(args.years, coverage=args.weights == 'coverage')
+    panel['Region'] = assign_regions(panel['Latitude'], panel['Longitude'])
+    weight_column = add_weights(panel, args.weights)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # The All India mask is also the clean series of every other output
+    keep, keep_east = outlier_masks(panel, args.detector)
+    panel['avg_rad_clean'] = panel['avg_rad'].where(keep)
+    if args.compare:
+        compare_detectors(panel, args.compare).to_csv(path('outlier_comparison.csv'), index=False)
+    # analyze_without_outliers.py's robust statistics, summary, distributions and trends
+    write_outputs(panel, keep, keep_east, scheduler, args.output_dir)
+    timings['outliers'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    yearly = {column: yearly_statistics(panel, column, weight_column) for column in SERIES}
+    regional = {column: regional_statistics(panel, column, weight_column) for column in SERIES}
+    pd.concat([df.assign(Series=column) for column, df in yearly.items()]).to_csv(
+        path('yearly_stats.csv'), index=False)
+    pd.concat([df.assign(Series=column) for column, df in regional.items()]).to_csv(
+        path('regional_stats.csv'), index=False)
+    timings['statistics'] = time.perf_counter() - start
+
+    first, last = min(args.years), max(args.years)
+    for column, suffix in SERIES.items():
+        label = ", Without Outliers" if suffix else ""
+        fig = trends_figure(yearly[column], f"Light Pollution Trends in India ({first}-{last}{label})",
+                            f"Mean Light Pollution Over Time{' (Without Outliers)' if suffix else ''}")
+        submit_plotly(scheduler, fig, path(f"temporal_analysis_trends{suffix}.html"))
+        fig = regional_figure(regional[column], 'mean', f"Regional Light Pollution Trends ({first}-{last}{label})")
+        submit_plotly(scheduler, fig, path(f"regional_trends{suffix}.html"))
+
+    # Difference grids are only needed for the folium maps
+    start = time.perf_counter()
+    if scheduler.wants('html') and first != last:
+        before = panel[panel['Year'] == first]
+        after = panel[panel['Year'] == last]
+        for column, suffix in SERIES.items():
+            grid_lat, grid_lon, diff = difference_grid(before, after, column, weight_column=weight_column)
+            scheduler.submit('html', save_folium, difference_map(grid_lat, grid_lon, diff),
+                             path(f"light_pollution_difference{suffix}_{first}_{last}.html"))
+    timings['difference'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged, correlation = population_correlation(yearly['avg_rad'], population_growth(years=args.years))
+    merged.to_csv(path('population_correlation.csv'), index=False)
+    fig, scatter_fig = correlation_figures(merged, correlation)
+    submit_plotly(scheduler, fig, path("population_light_correlation.html"))
+    submit_plotly(scheduler, scatter_fig, path("correlation_scatter.html"))
+    timings['correlation'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scheduler.run()
+    if scheduler.wants('json'):
+        write_dashboard(args.output_dir)
+    timings['render'] = time.perf_counter() - start
+
+    print(f"Analysed {len(panel)} samples over {len(args.years)} years "
+          f"({int(keep.sum())} kept by the {args.detector} detector)")
+    print(f"Population growth vs mean radiance correlation: {correlation:.3f}")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<12}{seconds:.2f}s")
+    print(f"Results have been saved to {args.output_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from orion import catalog, config
+from orion.features import FEATURE_SETS, build_features, neighbourhood
+from orion.regions import assign_regions
+from orion.train import HORIZONS, PARAMS, train
+from orion.viirs import load_panel, viirs_path
+
+# Rolling-origin evaluation: for every origin year Y a model sees only years <= Y and is
+# scored on Y+1 ... Y+k, the way it would be used to forecast. The notebook's random
+# 80/20 split mixes future years into training and flatters the model.
+
+fold_dir = os.path.join(config.cache_dir, "backtest")
+
+MIN_TRAIN_YEARS = 4
+MAX_HORIZON = 3
+NUM_BOOST_ROUND = 200  # Fixed rounds per fold; early stopping would need a year the fold may not have
+
+# name -> how to fit it; 'persistence' is the no-skill baseline (last year's nearby radiance)
+MODELS = {
+    'persistence': None,
+    'xgboost-basic': {'feature_set': 'basic'},
+    'xgboost-spatiotemporal': {'feature_set': 'spatiotemporal'},
+}
+
+
+def folds(years=config.YEARS, min_train_years=MIN_TRAIN_YEARS, max_horizon=MAX_HORIZON):
+    # (origin, [target years]) for every origin with enough history and at least one later year
+    years = sorted(years)
+    return [(origin, [y for y in years if origin < y <= origin + max_horizon])
+            for origin in years[min_train_years - 1:-1]]
+
+
+def fold_key(model, origin, years, clip, num_boost_round):
+    # Identifies a fitted fold by its recipe and the exact bytes of the data it was trained on
+    spec = {
+        'model': model,
+        'spec': MODELS[model],
+        'years': [y for y in years if y <= origin],
+        'data': [catalog.content_hash(viirs_path(y)) for y in years if y <= origin],
+        'clip': clip,
+        'rounds': num_boost_round,
+        'horizons': HORIZONS,
+        'params': PARAMS,
+        'xgboost': xgb.__version__,
+    }
+    digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{model}_{origin}_{digest}"
+
+
+def fold_model(model, origin, years, clip, num_boost_round, nthread):
+    # Fitted booster for one fold, loaded from the cache when the same fold ran before
+    path = os.path.join(fold_dir, f"{fold_key(model, origin, years, clip, num_boost_round)}.ubj")
+    booster = xgb.Booster()
+    if os.path.exists(path):
+        booster.load_model(path)
+        return booster, True
+    booster, _, _ = train([y for y in years if y <= origin], None, {'nthread': nthread}, num_boost_round,
+                          clip=clip, log=lambda *args: None, **MODELS[model])
+    os.makedirs(fold_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    booster.save_model(temp_path)
+    os.replace(temp_path, path)
+    return booster, False
+
+
+def run_fold(model, origin, targets, years, clip=False, num_boost_round=NUM_BOOST_ROUND, nthread=0):
+    # Predictions for every sample of the fold's target years, tagged with horizon and region
+    start = time.perf_counter()
+    panel = load_panel(targets, clip)
+    panel = panel[~np.isnan(panel['avg_rad'].to_numpy())]
+    lat = panel['Latitude'].to_numpy()
+    lon = panel['Longitude'].to_numpy()
+    year = panel['Year'].to_numpy()
+    horizon = year - origin
+
+    cached = False
+    if MODELS[model] is None:
+        predicted = neighbourhood(lat, lon, origin, clip)[2]
+    else:
+        booster, cached = fold_model(model, origin, years, clip, num_boost_round, nthread)
+        features = FEATURE_SETS[MODELS[model]['feature_set']]
+        predicted = booster.inplace_predict(build_features(lat, lon, year, horizon, features, clip))
+
+    predictions = pd.DataFrame({
+        'Model': model,
+        'Origin': origin,
+        'Horizon': horizon,
+        'Year': year,
+        'Region': assign_regions(lat, lon),
+        'Actual': panel['avg_rad'].to_numpy(),
+        'Predicted': predicted,
+    })
+    return predictions, time.perf_counter() - start, cached
+
+
+def backtest(models=tuple(MODELS), years=config.YEARS, min_train_years=MIN_TRAIN_YEARS, max_horizon=MAX_HORIZON,
+             clip=False, num_boost_round=NUM_BOOST_ROUND, workers=None, log=print):
+    # Every (model, fold) pair as one task; folds run in separate processes when workers > 1
+    workers = workers if workers is not None else os.cpu_count() or 1
+    tasks = [(model, origin, targets) for model in models
+             for origin, targets in folds(years, min_train_years, max_horizon)]
+    # One XGBoost thread per process when folds already fill the cores
+    nthread = 1 if workers > 1 else 0
+    args = [(model, origin, targets, list(years), clip, num_boost_round, nthread)
+            for model, origin, targets in tasks]
+
+    if workers <= 1 or len(tasks) == 1:
+        results = [run_fold(*task) for task in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            futures = [pool.submit(run_fold, *task) for task in args]
+            results = [future.result() for future in futures]
+
+    for (model, origin, targets), (_, elapsed, cached) in zip(tasks, results):
+        log(f"  {model:<24}train <= {origin}, predict {targets[0]}-{targets[-1]}: "
+            f"{elapsed:.2f}s{' (cached model)' if cached else ''}")
+    return pd.concat([predictions for predictions, _, _ in results], ignore_index=True)
+
+
+def score(predictions, by):
+    # MAE, RMSE, bias and sample count per model and grouping column
+    error = predictions['Predicted'] - predictions['Actual']
+    frame = pd.DataFrame({'Model': predictions['Model'], by: predictions[by],
+                          'abs': error.abs(), 'sq': error ** 2, 'err': error})
+    grouped = frame.groupby(['Model', by])
+    table = pd.DataFrame({
+        'MAE': grouped['abs'].mean(),
+        'RMSE': np.sqrt(grouped['sq'].mean()),
+        'Bias': grouped['err'].mean(),
+        'Samples': grouped.size(),
+    })
+    return table.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest: train on years <= Y, "
+                                                 "score Y+1..Y+k, per horizon and region")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS)
+    parser.add_argument("--min-train-years", type=int, default=MIN_TRAIN_YEARS,
+                        help="Years of history the first fold trains on")
+    parser.add_argument("--max-horizon", type=int, default=MAX_HORIZON, help="Years ahead each fold predicts")
+    parser.add_argument("--rounds", type=int, default=NUM_BOOST_ROUND, help="Boosting rounds per fold")
+    parser.add_argument("--clip", action="store_true", help="Only use samples inside the India boundary")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel fold processes (default: all cores)")
+    parser.add_argument("-o", "--output-dir", default=config.analysis_dir)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print(f"Backtesting {len(args.models)} models over {len(folds(args.years, args.min_train_years))} folds")
+    predictions = backtest(args.models, args.years, args.min_train_years, args.max_horizon, args.clip,
+                           args.rounds, args.workers)
+    by_horizon = score(predictions, 'Horizon')
+    by_region = score(predictions, 'Region')
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    by_horizon.to_csv(os.path.join(args.output_dir, "backtest_by_horizon.csv"), index=False)
+    by_region.to_csv(os.path.join(args.output_dir, "backtest_by_region.csv"), index=False)
+
+    print("\nBy horizon:")
+    print(by_horizon.to_string(index=False, float_format='%.3f'))
+    print("\nBy region:")
+    print(by_region.to_string(index=False, float_format='%.3f'))
+    print(f"\nBacktest finished in {time.perf_counter() - start:.2f}s; "
+          f"results have been saved to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
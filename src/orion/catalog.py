@@ -0,0 +1,121 @@
+import argparse
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+from orion import config
+
+# Logical datasets and every place they are known to live, in order of preference.
+# Yearly datasets use a `{year}` placeholder in their file names.
+DATASETS = {
+    'viirs': [
+        os.path.join(config.viirs_dir, "VIIRS_India_{year}.csv"),
+        os.path.join(config.src_root, "Orion_Model", "VIIRS", "VIIRS_{year}.csv"),
+    ],
+    'viirs_monthly': [
+        os.path.join(config.viirs_dir, "VIIRS_India_monthly_{year}.csv"),
+        os.path.join(config.sample_dir, "VIIRS_India_monthly_{year}.csv"),
+    ],
+    'boundary': [
+        config.boundary_file,
+    ],
+}
+
+manifest_path = os.path.join(config.cache_dir, "catalog.json")
+_manifest = None
+
+
+def candidates(name, year=None):
+    # Existing files for a dataset (and year), preferred location first
+    if name not in DATASETS:
+        raise KeyError(f"Unknown dataset '{name}' (known: {', '.join(sorted(DATASETS))})")
+    paths = [template.format(year=year) for template in DATASETS[name]]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def resolve(name, year=None):
+    # Path of the preferred copy of a dataset
+    paths = candidates(name, year)
+    if not paths:
+        where = ", ".join(template.format(year=year) for template in DATASETS[name])
+        raise FileNotFoundError(f"No copy of '{name}'{f' for {year}' if year is not None else ''} found in: {where}")
+    return paths[0]
+
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(manifest_path) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def save_manifest():
+    # Write-then-rename so concurrent processes never read a half-written manifest
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(load_manifest(), f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def content_hash(path):
+    # SHA-256 of a file's bytes, remembered by (size, mtime) so unchanged files are hashed once
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    manifest = load_manifest()
+    entry = manifest.get(path)
+    if entry is None or entry['stamp'] != stamp:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        manifest[path] = {'stamp': stamp, 'sha256': digest.hexdigest()}
+        save_manifest()
+    return manifest[path]['sha256']
+
+
+def cache_path(path, kind, suffix):
+    # Derived-file location keyed by content, so identical copies share one cached artifact
+    return os.path.join(config.cache_dir, kind, f"{content_hash(path)[:20]}{suffix}")
+
+
+def duplicates(name, years=config.YEARS):
+    # {year: {hash: [paths]}} for every year with more than one copy on disk
+    yearly = '{year}' in ''.join(DATASETS[name])
+    found = {}
+    for year in (years if yearly else [None]):
+        groups = defaultdict(list)
+        for path in candidates(name, year):
+            groups[content_hash(path)].append(path)
+        if sum(len(paths) for paths in groups.values()) > 1:
+            found[year] = dict(groups)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show where each dataset resolves and which copies are duplicates")
+    parser.add_argument("datasets", nargs="*", default=sorted(DATASETS))
+    args = parser.parse_args()
+
+    for name in args.datasets:
+        print(f"{name}:")
+        found = duplicates(name)
+        if not found:
+            print("  no duplicate copies")
+        for year, groups in found.items():
+            label = year if year is not None else name
+            for digest, paths in groups.items():
+                status = "identical copies" if len(paths) > 1 else "differs"
+                print(f"  {label} [{digest[:12]}] {status}:")
+                for path in paths:
+                    print(f"    {os.path.relpath(path, config.src_root)}")
+
+
+if __name__ == "__main__":
+    main()
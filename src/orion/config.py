@@ -0,0 +1,29 @@
+import os
+
+# Get the source root directory (the `src` folder)
+src_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Set paths
+data_dir = os.path.join(src_root, "data")
+viirs_dir = os.path.join(data_dir, "viirs")
+boundary_file = os.path.join(data_dir, "boundaries", "india_boundary.geojson")
+cache_dir = os.path.join(data_dir, "cache")
+sample_dir = os.path.join(data_dir, "sampled")  # Local stand-ins for the Earth Engine exports
+worldbank_dir = os.path.join(data_dir, "population")
+analysis_dir = os.path.join(src_root, "docs", "visualizations", "analysis")
+predictions_file = os.path.join(src_root, "future_predictions.csv")  # Read by the predicted-year heatmaps
+
+# Years covered by the VIIRS exports
+YEARS = list(range(2014, 2024))
+
+# Default map view over India
+MAP_CENTER = [22.9734, 78.6569]
+MAP_ZOOM = 5
+
+# Earth Engine sampling rectangle as (south, west, north, east)
+INDIA_BOUNDS = (6.0, 68.0, 37.0, 97.0)
+
+DARK_SKY_THRESHOLD = 3.0  # Radiance above this is considered unsuitable
+# Sites further than this from every sample have no radiance estimate (about the 99.9th
+# percentile of nearest-sample distances inside India for one year's 5000 samples)
+MAX_SAMPLE_DISTANCE_M = 75000.0
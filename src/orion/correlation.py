@@ -0,0 +1,242 @@
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import stats
+
+from orion import config
+from orion.coverage import WEIGHTINGS, group_means, grouped_means, point_weights
+from orion.interpolate import GridSpec
+from orion.regions import assign_regions
+from orion.viirs import load_panel
+from orion.worldbank import POPULATION_GROWTH, load_store
+
+# Every function below works on the last axis and broadcasts over the leading ones, so one
+# call handles the national series, every region or every grid cell. NaNs are dropped pairwise.
+
+BOOTSTRAP_SAMPLES = 2000
+CONFIDENCE = 0.95
+# Upper bound on elements in a (series, resamples, T[, T]) bootstrap block
+BLOCK_ELEMENTS = 2 ** 24
+
+
+def paired(x, y):
+    # Broadcast x and y together and blank out positions where either one is missing
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    missing = np.isnan(x) | np.isnan(y)
+    return np.where(missing, np.nan, x), np.where(missing, np.nan, y)
+
+
+def pearson(x, y):
+    x, y = paired(x, y)
+    valid = ~np.isnan(x)
+    n = valid.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dx = x - np.nansum(x, axis=-1, keepdims=True) / n[..., None]
+        dy = y - np.nansum(y, axis=-1, keepdims=True) / n[..., None]
+        r = np.nansum(dx * dy, axis=-1) / np.sqrt(np.nansum(dx * dx, axis=-1) * np.nansum(dy * dy, axis=-1))
+    return np.where(n >= 3, np.clip(r, -1, 1), np.nan)
+
+
+def spearman(x, y):
+    # Pearson on average ranks of the pairwise-complete values
+    x, y = paired(x, y)
+    return pearson(stats.rankdata(x, axis=-1, nan_policy='omit'),
+                   stats.rankdata(y, axis=-1, nan_policy='omit'))
+
+
+def kendall(x, y):
+    # Tau-b from the signs of all pairwise differences, (..., T, T) at once
+    x, y = paired(x, y)
+    sx = np.sign(x[..., :, None] - x[..., None, :])
+    sy = np.sign(y[..., :, None] - y[..., None, :])
+    upper = np.triu(np.ones(sx.shape[-2:], dtype=bool), k=1)
+    valid = ~np.isnan(sx) & upper
+    sx = np.where(valid, sx, 0)
+    sy = np.where(valid, sy, 0)
+
+    pairs = valid.sum(axis=(-2, -1))
+    ties_x = (valid & (sx == 0)).sum(axis=(-2, -1))
+    ties_y = (valid & (sy == 0)).sum(axis=(-2, -1))
+    score = (sx * sy).sum(axis=(-2, -1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tau = score / np.sqrt((pairs - ties_x) * (pairs - ties_y))
+    return np.where(pairs >= 3, tau, np.nan)
+
+
+METHODS = {
+    'pearson': pearson,
+    'spearman': spearman,
+    'kendall': kendall,
+}
+
+
+def lagged(x, y, lags, method='pearson'):
+    # Correlation of x[t] with y[t + lag] for each lag; result has a trailing lag axis.
+    # Shifted copies of y are NaN-padded so every lag is evaluated in one broadcast call.
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    n_steps = x.shape[-1]
+    lags = np.asarray(lags)
+    shifted = np.full((len(lags),) + y.shape, np.nan)
+    for i, lag in enumerate(lags):
+        if abs(lag) >= n_steps:
+            continue
+        if lag >= 0:
+            shifted[i, ..., :n_steps - lag] = y[..., lag:]
+        else:
+            shifted[i, ..., -lag:] = y[..., :n_steps + lag]
+    return np.moveaxis(METHODS[method](x[None], shifted), 0, -1)
+
+
+def rolling(x, y, window, method='pearson'):
+    # Correlation over each trailing window; result has a trailing window-end axis of length T - window + 1
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    return METHODS[method](sliding_window_view(x, window, axis=-1), sliding_window_view(y, window, axis=-1))
+
+
+def bootstrap_ci(x, y, method='pearson', n_samples=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=0):
+    # Percentile intervals from resampling time steps with replacement. Every resample of
+    # every series is one fancy-indexed block, processed in memory-bounded chunks of series.
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    shape = x.shape[:-1]
+    n_steps = x.shape[-1]
+    x = x.reshape(-1, n_steps)
+    y = y.reshape(-1, n_steps)
+
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, n_steps, size=(n_samples, n_steps))
+
+    per_series = n_samples * n_steps * (n_steps if method == 'kendall' else 1)
+    chunk = max(1, BLOCK_ELEMENTS // per_series)
+    alpha = (1 - confidence) / 2
+    lower = np.empty(len(x))
+    upper = np.empty(len(x))
+    for start in range(0, len(x), chunk):
+        block = slice(start, start + chunk)
+        samples = METHODS[method](x[block][:, idx], y[block][:, idx])
+        # Series with too few valid years give all-NaN rows; their interval stays NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            lower[block], upper[block] = np.nanquantile(samples, [alpha, 1 - alpha], axis=-1)
+    return lower.reshape(shape), upper.reshape(shape)
+
+
+def correlation_table(x, y, labels, years, lags=(0,), window=None, n_samples=BOOTSTRAP_SAMPLES, seed=0):
+    # One row per series: all three coefficients, a Pearson bootstrap interval and the
+    # lagged and (optionally) rolling Pearson correlations, labelled by window end year
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+    x = x.reshape(-1, x.shape[-1])
+    y = y.reshape(-1, y.shape[-1])
+    table = pd.DataFrame({'Series': list(labels)})
+    for name, func in METHODS.items():
+        table[name.title()] = func(x, y)
+    table['CI_Low'], table['CI_High'] = bootstrap_ci(x, y, 'pearson', n_samples, seed=seed)
+    table['Valid_Years'] = (~np.isnan(paired(x, y)[0])).sum(axis=-1)
+
+    by_lag = lagged(x, y, lags)
+    for i, lag in enumerate(lags):
+        if lag != 0:
+            table[f'Lag_{lag:+d}'] = by_lag[:, i]
+    if window:
+        by_window = rolling(x, y, window)
+        for i, end in enumerate(list(years)[window - 1:]):
+            table[f'Rolling_{end}'] = by_window[:, i]
+    return table
+
+
+def national_series(panel, years, column='avg_rad', weight_column=None):
+    # Mean radiance per year as a (1, years) array
+    means = panel.groupby('Year')[column].mean()
+    if weight_column:
+        means[:] = grouped_means(panel, 'Year', column, weight_column)
+    return ['National'], means.reindex(years).to_numpy()[None, :]
+
+
+def regional_series(panel, years, column='avg_rad', weight_column=None):
+    # Mean radiance per region and year as a (regions, years) array
+    keys = [assign_regions(panel['Latitude'], panel['Longitude']), panel['Year']]
+    means = panel.groupby(keys)[column].mean()
+    if weight_column:
+        means[:] = grouped_means(panel, keys, column, weight_column)
+    means = means.unstack().reindex(columns=years)
+    return list(means.index), means.to_numpy()
+
+
+def cell_series(panel, years, resolution=1.0, column='avg_rad', min_points=3, weight_column=None):
+    # Mean radiance per grid cell and year as a (cells, years) array, from one bincount;
+    # weighted by weight_column when given, while min_points still counts samples
+    spec = GridSpec(resolution=resolution)
+    row, col = spec.cell_index(panel['Latitude'].to_numpy(), panel['Longitude'].to_numpy())
+    year_pos = pd.Index(years).get_indexer(panel['Year'])
+    keep = (row >= 0) & (year_pos >= 0)
+    values = panel[column].to_numpy()
+    keep &= ~np.isnan(values)
+
+    cell = row[keep] * spec.n_cols + col[keep]
+    cells, cell_pos = np.unique(cell, return_inverse=True)
+    flat = cell_pos * len(years) + year_pos[keep]
+    size = len(cells) * len(years)
+    counts = np.bincount(flat, minlength=size).reshape(len(cells), len(years))
+    if weight_column:
+        weighted, _ = group_means(flat, values[keep], panel[weight_column].to_numpy()[keep], size)
+        means = np.where(counts >= min_points, weighted.reshape(len(cells), len(years)), np.nan)
+    else:
+        sums = np.bincount(flat, weights=values[keep], minlength=size).reshape(len(cells), len(years))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts >= min_points, sums / counts, np.nan)
+
+    lat, lon = spec.centers()
+    labels = [f"{lat[c // spec.n_cols]:.2f},{lon[c % spec.n_cols]:.2f}" for c in cells]
+    return labels, means
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lagged, rolling and rank correlations of population growth "
+                                                 "with radiance, nationally, per region or per grid cell")
+    parser.add_argument("--by", choices=['national', 'region', 'cell'], default='national')
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS)
+    parser.add_argument("--country", default='IND', help="World Bank country code or name")
+    parser.add_argument("--lags", type=int, nargs="+", default=[-2, -1, 0, 1, 2],
+                        help="Years radiance is shifted relative to population growth")
+    parser.add_argument("--window", type=int, default=5, help="Rolling window in years (0 to skip)")
+    parser.add_argument("--bootstrap", type=int, default=BOOTSTRAP_SAMPLES, help="Bootstrap resamples")
+    parser.add_argument("--resolution", type=float, default=1.0, help="Cell size in degrees for --by cell")
+    parser.add_argument("--weights", choices=WEIGHTINGS, default='equal',
+                        help="Weight radiance means by each sample's cloud-free observation count (cf_cvg)")
+    parser.add_argument("-o", "--output", default=None, help="CSV to write")
+    args = parser.parse_args()
+
+    years = args.years
+    growth = load_store().series(args.country, POPULATION_GROWTH, years).to_numpy()
+    panel = load_panel(years, coverage=args.weights == 'coverage')
+    weight_column = None
+    if args.weights == 'coverage':
+        panel['Weight'] = point_weights(panel['cf_cvg'], args.weights)
+        weight_column = 'Weight'
+
+    if args.by == 'national':
+        labels, radiance = national_series(panel, years, weight_column=weight_column)
+    elif args.by == 'region':
+        labels, radiance = regional_series(panel, years, weight_column=weight_column)
+    else:
+        labels, radiance = cell_series(panel, years, args.resolution, weight_column=weight_column)
+
+    start = time.perf_counter()
+    table = correlation_table(growth, radiance, labels, years, args.lags, args.window or None, args.bootstrap)
+    elapsed = time.perf_counter() - start
+
+    output = args.output or os.path.join(config.analysis_dir, f"population_correlation_{args.by}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    table.to_csv(output, index=False)
+
+    print(table.head(10).to_string(index=False))
+    print(f"\n{len(labels)} series x {args.bootstrap} resamples in {elapsed:.2f}s")
+    print(f"Results have been saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+
+# Cloud-free coverage weighting. VIIRS monthly composites carry cf_cvg, the number of cloud-free
+# observations behind each pixel value; a value built from a couple of nights is much noisier than
+# one built from twenty, so means can weight by the count instead of counting every value once.
+# Exports made before the band was ingested have no counts (NaN) and fall back to equal weights.
+
+WEIGHTINGS = ['equal', 'coverage']
+
+
+def point_weights(cf_cvg, weighting='coverage'):
+    # Non-negative weight per value: its cloud-free count, or 1 for equal weighting / unknown counts
+    cf_cvg = np.asarray(cf_cvg, dtype=np.float64)
+    if weighting == 'equal':
+        return np.ones(cf_cvg.shape)
+    if weighting != 'coverage':
+        raise ValueError(f"Unknown weighting '{weighting}' (known: {', '.join(WEIGHTINGS)})")
+    return np.where(np.isnan(cf_cvg), 1.0, np.maximum(cf_cvg, 0))
+
+
+def add_weights(frame, weighting, column='Weight'):
+    # Store per-sample weights in `column` and return its name, or None when samples count alike
+    # (equal weighting, or a frame without cf_cvg such as the per-period means of load_periods)
+    if weighting == 'equal' or 'cf_cvg' not in frame:
+        return None
+    frame[column] = point_weights(frame['cf_cvg'], weighting)
+    return column
+
+
+def group_means(codes, values, weights, n_groups):
+    # Weighted mean of the non-NaN values of every group code, from two bincounts.
+    # Codes below 0 are skipped; groups without weight are NaN. Returns (means, total weights).
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    keep = (codes >= 0) & ~np.isnan(values)
+    sums = np.bincount(codes[keep], weights=values[keep] * weights[keep], minlength=n_groups)
+    totals = np.bincount(codes[keep], weights=weights[keep], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, sums / totals, np.nan), totals
+
+
+def grouped_means(frame, keys, column, weight_column):
+    # Weighted column mean per groupby(keys) group, in the order groupby(keys).agg() returns them
+    codes = frame.groupby(keys).ngroup().to_numpy()
+    means, _ = group_means(codes, frame[column].to_numpy(), frame[weight_column].to_numpy(),
+                           int(codes.max()) + 1 if len(codes) else 0)
+    return means
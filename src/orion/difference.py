@@ -0,0 +1,54 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+from orion.viirs import load_boundary
+
+GRID_SIZE = 100
+RADIUS_DEG = np.sqrt(0.1)  # Points within this many degrees (planar) of a cell centre are averaged
+
+
+def boundary_grid(size=GRID_SIZE):
+    # Regular lon/lat grid over the boundary's bounding box, as 2-D (lat, lon) arrays
+    west, south, east, north = load_boundary().bounds
+    lon, lat = np.meshgrid(np.linspace(west, east, size), np.linspace(south, north, size))
+    return lat, lon
+
+
+def radius_mean(lat, lon, values, grid_lat, grid_lon, radius=RADIUS_DEG, weights=None):
+    # Mean of the non-NaN values within `radius` of every grid point, via one sparse
+    # distance matrix instead of a boolean mask over all points per cell.
+    # Cells with no points are 0; cells whose points are all NaN (or carry no weight) are NaN.
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    points = cKDTree(np.column_stack([lon, lat]))
+    cells = cKDTree(np.column_stack([np.ravel(grid_lon), np.ravel(grid_lat)]))
+    pairs = cells.sparse_distance_matrix(points, radius, output_type='ndarray')
+    pairs = pairs[pairs['v'] < radius]  # Strict, matching the original `< 0.1` squared test
+
+    n_cells = cells.n
+    hits = np.bincount(pairs['i'], minlength=n_cells)
+    pair_values = values[pairs['j']]
+    pair_weights = weights[pairs['j']]
+    valid = ~np.isnan(pair_values)
+    sums = np.bincount(pairs['i'][valid], weights=pair_values[valid] * pair_weights[valid], minlength=n_cells)
+    counts = np.bincount(pairs['i'][valid], weights=pair_weights[valid], minlength=n_cells)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    means = np.where(hits > 0, means, 0.0)
+    return means.reshape(np.shape(grid_lat))
+
+
+def difference_grid(before, after, column='avg_rad', size=GRID_SIZE, radius=RADIUS_DEG, weight_column=None):
+    # Change in local mean radiance between two years' Latitude/Longitude frames
+    grid_lat, grid_lon = boundary_grid(size)
+    values = [radius_mean(df['Latitude'].to_numpy(), df['Longitude'].to_numpy(), df[column].to_numpy(),
+                          grid_lat, grid_lon, radius, df[weight_column].to_numpy() if weight_column else None)
+              for df in (before, after)]
+    return grid_lat, grid_lon, values[1] - values[0]
+
+
+def heat_points(grid_lat, grid_lon, diff):
+    # [[lat, lon, change], ...] for the cells that changed
+    keep = (diff != 0) & ~np.isnan(diff)
+    return np.column_stack([grid_lat[keep], grid_lon[keep], diff[keep]]).tolist()
@@ -0,0 +1,95 @@
+import glob
+import json
+import os
+
+PLOTLY_JS = "plotly.min.js"
+SPEC_SUFFIX = ".plotly.json"
+DASHBOARD = "index.html"
+
+
+def ensure_plotlyjs(output_dir):
+    # One shared copy of plotly.js per output folder instead of ~3.5 MB inlined in every page
+    path = os.path.join(output_dir, PLOTLY_JS)
+    if not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+    return path
+
+
+def write_plotly_html(fig, path):
+    # Standalone page that loads plotly.js from the same folder
+    fig.write_html(path, include_plotlyjs='directory', full_html=True)
+    return path
+
+
+def spec_path(path):
+    # "…/regional_trends.html" -> "…/regional_trends.plotly.json"
+    return os.path.splitext(path)[0] + SPEC_SUFFIX
+
+
+def write_plotly_json(fig, path):
+    # Data + layout only; rendered by the dashboard page
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(fig.to_json(pretty=False, remove_uids=True))
+    return path
+
+
+def submit_plotly(scheduler, fig, path):
+    # Queue the compact HTML page and/or the JSON spec for `path`, depending on the formats enabled
+    if scheduler.wants('html') or scheduler.wants('json'):
+        ensure_plotlyjs(os.path.dirname(path))
+    scheduler.submit('html', write_plotly_html, fig, path)
+    scheduler.submit('json', write_plotly_json, fig, spec_path(path))
+
+
+DASHBOARD_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <script src="{plotly_js}"></script>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        nav a {{ margin-right: 15px; }}
+        .figure {{ margin: 30px 0; min-height: 450px; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+    <nav>{links}</nav>
+    {divs}
+    <script>
+        // Figures are fetched as JSON specs; serve this folder over HTTP
+        // (e.g. `python -m http.server`) since browsers block fetch() on file:// URLs.
+        const specs = {specs};
+        for (const [id, file] of specs) {{
+            fetch(file)
+                .then(response => response.json())
+                .then(fig => Plotly.newPlot(id, fig.data, fig.layout, {{responsive: true}}))
+                .catch(error => {{ document.getElementById(id).textContent = `Could not load ${{file}}: ${{error}}`; }});
+        }}
+    </script>
+</body>
+</html>
+"""
+
+
+def write_dashboard(output_dir, title="Light Pollution Analysis"):
+    # Single index page listing every JSON spec in the folder, so each script's figures show up
+    ensure_plotlyjs(output_dir)
+    files = sorted(os.path.basename(p) for p in glob.glob(os.path.join(output_dir, "*" + SPEC_SUFFIX)))
+
+    specs, links, divs = [], [], []
+    for file in files:
+        name = file[:-len(SPEC_SUFFIX)]
+        specs.append([name, file])
+        label = name.replace("_", " ").title()
+        links.append(f'<a href="#{name}">{label}</a>')
+        divs.append(f'<h2>{label}</h2>\n    <div class="figure" id="{name}"></div>')
+
+    path = os.path.join(output_dir, DASHBOARD)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(DASHBOARD_TEMPLATE.format(title=title, plotly_js=PLOTLY_JS, links="\n        ".join(links),
+                                          divs="\n    ".join(divs), specs=json.dumps(specs)))
+    return path
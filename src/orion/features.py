@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from orion import config
+from orion.regions import REGIONS, assign_regions
+from orion.spatial import PointIndex
+from orion.viirs import year_index
+
+# VIIRS samples are drawn at new random locations every year, so a point's "history" is
+# read from the earlier years' samples around it through their spatial indexes.
+# Features for year t come from an observed source year t - horizon, which lets the same
+# builder serve training rows (horizon 1..H) and forecasts H years past the last export.
+
+NEIGHBOURS = 8
+BRIGHT_THRESHOLD = 10.0  # nW/cm²/sr; samples at least this bright mark urban light clusters
+
+BASIC_FEATURES = ['latitude', 'longitude', 'year']
+SPATIOTEMPORAL_FEATURES = BASIC_FEATURES + [
+    'region',
+    'horizon',
+    'lag_nearest',        # Radiance of the nearest sample in the source year
+    'lag_distance_m',     # ...and how far away it was
+    'lag_mean',           # Inverse-distance mean of the NEIGHBOURS nearest source-year samples
+    'lag_max',            # Brightest of those neighbours
+    'lag2_mean',          # Same neighbourhood mean one year earlier still
+    'lag_trend',          # lag_mean - lag2_mean
+    'bright_distance_m',  # Distance to the nearest bright sample in the source year
+]
+FEATURE_SETS = {
+    'basic': BASIC_FEATURES,
+    'spatiotemporal': SPATIOTEMPORAL_FEATURES,
+}
+
+
+@lru_cache(maxsize=None)
+def bright_index(year, clip=False, threshold=BRIGHT_THRESHOLD):
+    index, values = year_index(year, clip)
+    bright = values >= threshold
+    if not bright.any():
+        return None
+    return PointIndex(index.lat[bright], index.lon[bright])
+
+
+def neighbourhood(lat, lon, year, clip=False, k=NEIGHBOURS):
+    # Nearest value, its distance, and the IDW mean / max of the k nearest samples of `year`
+    n = len(lat)
+    nan = np.full(n, np.nan)
+    if year not in config.YEARS:
+        return nan, nan, nan, nan
+    index, values = year_index(year, clip)
+    distance, idx = index.query(lat, lon, k=min(k, len(index)), workers=-1)
+    distance = distance.reshape(n, -1)
+    idx = idx.reshape(n, -1)
+    weights = 1.0 / np.maximum(distance, 1.0)
+    neighbours = values[idx]
+    mean = (weights * neighbours).sum(axis=1) / weights.sum(axis=1)
+    return neighbours[:, 0], distance[:, 0], mean, neighbours.max(axis=1)
+
+
+def lag_features(lat, lon, source_year, clip=False):
+    # Every lag feature for points whose history comes from `source_year`
+    nearest, nearest_distance, mean, maximum = neighbourhood(lat, lon, source_year, clip)
+    _, _, mean2, _ = neighbourhood(lat, lon, source_year - 1, clip)
+    bright = bright_index(source_year, clip) if source_year in config.YEARS else None
+    bright_distance = bright.query(lat, lon, workers=-1)[0] if bright is not None else np.full(len(lat), np.nan)
+    return {
+        'lag_nearest': nearest,
+        'lag_distance_m': nearest_distance,
+        'lag_mean': mean,
+        'lag_max': maximum,
+        'lag2_mean': mean2,
+        'lag_trend': mean - mean2,
+        'bright_distance_m': bright_distance,
+    }
+
+
+def build_features(lat, lon, year, horizon=1, features=SPATIOTEMPORAL_FEATURES, clip=False):
+    # (rows, features) float32 matrix for arbitrary (lat, lon, year, horizon) rows.
+    # Rows are grouped by source year so each group is a single batched KD-tree query.
+    lat, lon, year, horizon = (np.asarray(a) for a in
+                               np.broadcast_arrays(np.atleast_1d(lat), np.atleast_1d(lon),
+                                                   np.atleast_1d(year), np.atleast_1d(horizon)))
+    lat = lat.astype(float)
+    lon = lon.astype(float)
+    columns = {'latitude': lat, 'longitude': lon, 'year': year.astype(float), 'horizon': horizon.astype(float)}
+    if 'region' in features:
+        columns['region'] = pd.Index(REGIONS).get_indexer(assign_regions(lat, lon)).astype(float)
+
+    lag_names = [name for name in features if name not in columns]
+    if lag_names:
+        lagged = {name: np.full(len(lat), np.nan) for name in lag_names}
+        source = year - horizon
+        for source_year in np.unique(source):
+            rows = np.flatnonzero(source == source_year)
+            group = lag_features(lat[rows], lon[rows], int(source_year), clip)
+            for name in lag_names:
+                lagged[name][rows] = group[name]
+        columns.update(lagged)
+
+    return np.column_stack([columns[name] for name in features]).astype(np.float32)
+
+
+def forecast_horizon(year, latest_year):
+    # Years ahead of the latest export; in-sample years use the previous year's history
+    return np.maximum(np.asarray(year) - latest_year, 1)
+
+
+def training_rows(panel, horizons=(1,)):
+    # Stack the panel once per horizon, keeping rows whose source year was exported
+    years = set(panel['Year'].unique())
+    stacked = []
+    for horizon in horizons:
+        rows = panel[(panel['Year'] - horizon).isin(years).to_numpy()]
+        stacked.append(rows.assign(horizon=horizon))
+    return pd.concat(stacked, ignore_index=True)
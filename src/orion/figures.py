@@ -0,0 +1,85 @@
+import folium
+from folium.plugins import HeatMap
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+from orion import config
+from orion.difference import heat_points
+
+
+def trends_figure(yearly_stats, title, mean_title='Mean Light Pollution Over Time', x='Year',
+                  change_title='Year-over-Year Change (%)'):
+    # Mean radiance per year (or per period of column x) above its change from the previous one
+    fig = make_subplots(rows=2, cols=1,
+                        subplot_titles=(mean_title, change_title))
+
+    fig.add_trace(
+        go.Scatter(x=yearly_stats[x], y=yearly_stats['Mean_Radiance'],
+                   mode='lines+markers', name='Mean Radiance',
+                   line=dict(color='cyan')),
+        row=1, col=1
+    )
+
+    yoy_change = yearly_stats['Mean_Radiance'].pct_change() * 100
+    fig.add_trace(
+        go.Bar(x=yearly_stats[x][1:], y=yoy_change[1:],
+               name='YoY Change %',
+               marker_color=['red' if change < 0 else 'green' for change in yoy_change[1:]]),
+        row=2, col=1
+    )
+
+    fig.update_layout(height=800, title_text=title, showlegend=True)
+    return fig
+
+
+def regional_figure(regional_df, column, title, x='Year'):
+    return px.line(regional_df, x=x, y=column, color='Region', title=title,
+                   labels={column: 'Average Radiance', x: x})
+
+
+def difference_map(grid_lat, grid_lon, diff):
+    # Folium heatmap of the cells whose local mean radiance changed
+    m = folium.Map(location=config.MAP_CENTER, zoom_start=config.MAP_ZOOM,
+                   tiles='CartoDB dark_matter')
+    HeatMap(
+        heat_points(grid_lat, grid_lon, diff),
+        radius=15,
+        blur=10,
+        min_opacity=0.3,
+        max_zoom=6,
+        gradient={
+            '0.4': 'blue',
+            '0.6': 'lime',
+            '0.8': 'yellow',
+            '1.0': 'red'
+        }
+    ).add_to(m)
+    return m
+
+
+def correlation_figures(merged_df, correlation):
+    # Growth rate and mean radiance on twin axes, and their scatter with an OLS trendline
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig.add_trace(
+        go.Scatter(x=merged_df['Year'], y=merged_df['Growth_Rate'],
+                   name="Population Growth Rate (%)", line=dict(color="blue")),
+        secondary_y=False
+    )
+    fig.add_trace(
+        go.Scatter(x=merged_df['Year'], y=merged_df['Mean_Radiance'],
+                   name="Mean Radiance", line=dict(color="red")),
+        secondary_y=True
+    )
+    fig.update_layout(
+        title=f"Population Growth Rate vs Light Pollution (Correlation: {correlation:.3f})",
+        xaxis_title="Year",
+        hovermode="x unified"
+    )
+    fig.update_yaxes(title_text="Population Growth Rate (%)", secondary_y=False)
+    fig.update_yaxes(title_text="Mean Radiance", secondary_y=True)
+
+    scatter_fig = px.scatter(merged_df, x='Growth_Rate', y='Mean_Radiance',
+                             trendline="ols",
+                             title=f"Population Growth Rate vs Mean Radiance (Correlation: {correlation:.3f})")
+    return fig, scatter_fig
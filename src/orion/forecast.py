@@ -0,0 +1,139 @@
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from orion import config
+from orion.viirs import load_panel
+
+# Classical forecasts for short annual series such as the national mean radiance.
+# Ten yearly points are far too few for the notebook's 3-layer LSTM; these models fit in
+# milliseconds and give prediction intervals. statsmodels is only imported when needed.
+
+FORECAST_STEPS = 7
+CONFIDENCE = 0.95
+DEFAULT_METHOD = 'ets-damped'
+
+
+def national_series(years=config.YEARS, clip=False, column='avg_rad'):
+    # Mean radiance of every exported sample per year
+    panel = load_panel(years, clip)
+    return panel.groupby('Year')[column].mean().reindex(years)
+
+
+def as_annual(series):
+    # statsmodels wants a regular time index to label forecasts. Every method here assumes one step
+    # per year, so gaps (e.g. --years 2014 2016 2020, or a year without data) are rejected rather
+    # than relabelled as consecutive years.
+    series = series.sort_index()
+    years = pd.Index(series.index).astype(int)
+    missing = sorted(set(range(years.min(), years.max() + 1)) - set(years)) if len(years) else []
+    if missing:
+        raise ValueError(f"Forecasts need consecutive years; missing {', '.join(map(str, missing))} "
+                         f"in {years.min()}-{years.max()}")
+    return pd.Series(np.asarray(series, dtype=float), index=pd.PeriodIndex(years.astype(str), freq='Y'))
+
+
+def fit_ets(y, damped=True):
+    from statsmodels.tsa.exponential_smoothing.ets import ETSModel
+    return ETSModel(y, error='add', trend='add', damped_trend=damped).fit(disp=False)
+
+
+def fit_arima(y, order=(1, 1, 0)):
+    from statsmodels.tsa.arima.model import ARIMA
+    return ARIMA(y, order=order, trend='t').fit(method_kwargs={'warn_convergence': False})
+
+
+def ets_forecast(y, steps, confidence, damped=True):
+    result = fit_ets(y, damped)
+    frame = result.get_prediction(start=len(y), end=len(y) + steps - 1).summary_frame(alpha=1 - confidence)
+    return result.fittedvalues.to_numpy(), frame['mean'].to_numpy(), frame['pi_lower'].to_numpy(), \
+        frame['pi_upper'].to_numpy()
+
+
+def arima_forecast(y, steps, confidence):
+    result = fit_arima(y)
+    frame = result.get_forecast(steps).summary_frame(alpha=1 - confidence)
+    # The first differenced fit is undefined; report the observation instead of ARIMA's zero
+    fitted = np.array(result.fittedvalues)
+    fitted[0] = y.iloc[0]
+    return fitted, frame['mean'].to_numpy(), frame['mean_ci_lower'].to_numpy(), frame['mean_ci_upper'].to_numpy()
+
+
+def drift_forecast(y, steps, confidence):
+    # Random walk with drift in closed form: no fitting, no statsmodels
+    values = y.to_numpy()
+    diffs = np.diff(values)
+    drift = diffs.mean()
+    sigma = diffs.std(ddof=1)
+    h = np.arange(1, steps + 1)
+    mean = values[-1] + drift * h
+    half = stats.norm.ppf(0.5 + confidence / 2) * sigma * np.sqrt(h * (1 + h / len(diffs)))
+    fitted = np.concatenate([[values[0]], values[:-1] + drift])
+    return fitted, mean, mean - half, mean + half
+
+
+METHODS = {
+    'ets-damped': lambda y, steps, confidence: ets_forecast(y, steps, confidence, damped=True),
+    'holt': lambda y, steps, confidence: ets_forecast(y, steps, confidence, damped=False),
+    'arima': arima_forecast,
+    'drift': drift_forecast,
+}
+
+
+def forecast(series, steps=FORECAST_STEPS, method=DEFAULT_METHOD, confidence=CONFIDENCE):
+    # (history, future): fitted values next to the observations, and point forecasts with
+    # prediction intervals for the `steps` years after the last one
+    y = as_annual(series.dropna())
+    with warnings.catch_warnings():
+        # Ten points rarely satisfy the optimisers' convergence checks; the fits are still usable
+        warnings.simplefilter('ignore')
+        fitted, mean, lower, upper = METHODS[method](y, steps, confidence)
+
+    last_year = int(series.dropna().index[-1])
+    history = pd.DataFrame({'Year': series.dropna().index.astype(int), 'Actual': y.to_numpy(), 'Fitted': fitted})
+    future = pd.DataFrame({'Year': np.arange(last_year + 1, last_year + steps + 1), 'Forecast': mean,
+                           'Lower': lower, 'Upper': upper})
+    return history, future
+
+
+def fit_errors(history):
+    error = history['Fitted'] - history['Actual']
+    return {'mae': float(error.abs().mean()), 'rmse': float(np.sqrt((error ** 2).mean()))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast the national mean radiance with classical models")
+    parser.add_argument("--method", choices=list(METHODS), default=DEFAULT_METHOD)
+    parser.add_argument("--steps", type=int, default=FORECAST_STEPS, help="Years to forecast")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help="Prediction interval coverage")
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS)
+    parser.add_argument("--clip", action="store_true", help="Only use samples inside the India boundary")
+    parser.add_argument("-o", "--output", default=None, help="CSV to write")
+    args = parser.parse_args()
+
+    series = national_series(args.years, args.clip)
+    start = time.perf_counter()
+    try:
+        history, future = forecast(series, args.steps, args.method, args.confidence)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+
+    output = args.output or os.path.join(config.analysis_dir, f"national_forecast_{args.method}.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    pd.concat([history, future], ignore_index=True).to_csv(output, index=False)
+
+    errors = fit_errors(history)
+    print(future.to_string(index=False, float_format='%.4f'))
+    print(f"\n{args.method}: in-sample MAE {errors['mae']:.4f}, RMSE {errors['rmse']:.4f}; "
+          f"{int(args.confidence * 100)}% intervals; forecast in {elapsed * 1000:.1f} ms")
+    print(f"Results have been saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from orion import catalog, config
+from orion.coverage import WEIGHTINGS
+from orion.spatial import chord_to_meters
+from orion.viirs import viirs_path, year_index, year_weights
+
+METHODS = ['idw', 'kriging']
+
+# Number of query points handled per batch, keeps the (batch, k, k) kriging systems small
+BATCH_SIZE = 65536
+IDW_NEIGHBOURS = 8  # Samples each inverse-distance estimate is built from
+
+
+class GridSpec:
+    # Regular lat/lon grid of cell centers, rows running north to south like an image
+
+    def __init__(self, bounds=config.INDIA_BOUNDS, resolution=0.05):
+        self.south, self.west, self.north, self.east = bounds
+        self.resolution = resolution
+        self.n_rows = int(round((self.north - self.south) / resolution))
+        self.n_cols = int(round((self.east - self.west) / resolution))
+
+    @property
+    def shape(self):
+        return (self.n_rows, self.n_cols)
+
+    @property
+    def key(self):
+        return f"{self.south:g}_{self.west:g}_{self.north:g}_{self.east:g}_{self.resolution:g}"
+
+    def centers(self):
+        lat = self.north - (np.arange(self.n_rows) + 0.5) * self.resolution
+        lon = self.west + (np.arange(self.n_cols) + 0.5) * self.resolution
+        return lat, lon
+
+    def cell_index(self, lat, lon):
+        # Row/column of the cell containing each point, -1 when outside the grid
+        row = np.floor((self.north - np.asarray(lat, dtype=float)) / self.resolution).astype(np.int64)
+        col = np.floor((np.asarray(lon, dtype=float) - self.west) / self.resolution).astype(np.int64)
+        outside = (row < 0) | (row >= self.n_rows) | (col < 0) | (col >= self.n_cols)
+        return np.where(outside, -1, row), np.where(outside, -1, col)
+
+
+def idw(index, values, lat, lon, k=IDW_NEIGHBOURS, power=2.0, sample_weights=None):
+    # k-nearest inverse-distance weighting; an exact hit returns the sample value itself.
+    # sample_weights (e.g. cf_cvg counts) scale each neighbour's inverse-distance weight.
+    k = min(k, len(index))
+    distance, idx = index.query(lat, lon, k=k)
+    distance = distance.reshape(len(distance), -1)
+    idx = idx.reshape(len(idx), -1)
+
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / distance ** power
+    exact = np.isinf(weights)
+    hit = exact.any(axis=1)
+    weights[hit] = exact[hit]
+    if sample_weights is not None:
+        scaled = weights * sample_weights[idx]
+        # Neighbourhoods whose samples all carry zero weight fall back to plain distances
+        weights = np.where(scaled.sum(axis=1, keepdims=True) > 0, scaled, weights)
+
+    return (weights * values[idx]).sum(axis=1) / weights.sum(axis=1)
+
+
+def default_variogram(index, values):
+    # Heuristic exponential covariance: sill from the sample variance, range from sample spacing
+    spacing, _ = index.query(index.lat, index.lon, k=2)
+    sill = float(np.var(values))
+    return {
+        'sill': sill,
+        'nugget': 0.1 * sill,
+        'range_m': 3.0 * float(np.median(spacing[:, 1])),
+    }
+
+
+def kriging(index, values, lat, lon, k=16, sill=None, nugget=None, range_m=None):
+    # Ordinary kriging on the k nearest samples with an exponential covariance model
+    if sill is None or nugget is None or range_m is None:
+        params = default_variogram(index, values)
+        sill = params['sill'] if sill is None else sill
+        nugget = params['nugget'] if nugget is None else nugget
+        range_m = params['range_m'] if range_m is None else range_m
+
+    k = min(k, len(index))
+    distance, idx = index.query(lat, lon, k=k)
+    distance = distance.reshape(len(distance), -1)
+    idx = idx.reshape(len(idx), -1)
+
+    def covariance(h):
+        return (sill - nugget) * np.exp(-h / range_m)
+
+    # Pairwise distances between each query's neighbours, (n, k, k)
+    xyz = index.xyz[idx]
+    dot = np.einsum('nid,njd->nij', xyz, xyz)
+    pair_distance = chord_to_meters(np.sqrt(np.clip(2 - 2 * dot, 0, None)))
+
+    n = len(idx)
+    system = np.ones((n, k + 1, k + 1))
+    system[:, :k, :k] = covariance(pair_distance)
+    system[:, np.arange(k), np.arange(k)] += nugget
+    system[:, k, k] = 0.0
+
+    rhs = np.ones((n, k + 1))
+    rhs[:, :k] = covariance(distance)
+
+    weights = np.linalg.solve(system, rhs[..., None])[..., 0]
+    return (weights[:, :k] * values[idx]).sum(axis=1)
+
+
+def interpolate(index, values, lat, lon, method='idw', sample_weights=None, **kwargs):
+    # Vectorized interpolation over any number of query points, processed in fixed-size batches
+    if sample_weights is not None:
+        if method != 'idw':
+            raise ValueError(f"Sample weights are only supported by idw, not {method}")
+        kwargs['sample_weights'] = sample_weights
+    lat = np.asarray(lat, dtype=float).ravel()
+    lon = np.asarray(lon, dtype=float).ravel()
+    func = {'idw': idw, 'kriging': kriging}[method]
+    if method == 'kriging':
+        for name, value in default_variogram(index, values).items():
+            kwargs.setdefault(name, value)
+
+    result = np.empty(len(lat))
+    for start in range(0, len(lat), BATCH_SIZE):
+        stop = start + BATCH_SIZE
+        result[start:stop] = func(index, values, lat[start:stop], lon[start:stop], **kwargs)
+    return result
+
+
+def rasterize(year, spec=None, method='idw', weighting='equal', **kwargs):
+    # Interpolate one year's samples onto every cell center of the grid
+    spec = spec or GridSpec()
+    index, values = year_index(year)
+    lat, lon = spec.centers()
+    grid_lon, grid_lat = np.meshgrid(lon, lat)
+    grid = interpolate(index, values, grid_lat, grid_lon, method=method,
+                       sample_weights=year_weights(year, weighting), **kwargs)
+    return grid.reshape(spec.shape).astype(np.float32)
+
+
+def grid_path(year, spec, method, weighting='equal'):
+    # Keyed by the export's content as well as the grid, so a re-exported year gets a new grid.
+    # Equal weighting keeps the original names so existing grids stay valid.
+    suffix = '' if weighting == 'equal' else f"_{weighting}"
+    return catalog.cache_path(viirs_path(year), "grids", f"_{method}_{spec.key}{suffix}.npy")
+
+
+@lru_cache(maxsize=None)
+def cached_grid(year, method='idw', resolution=0.05, weighting='equal'):
+    # Precomputed interpolated grid for a year, built once and then memory-mapped from disk
+    spec = GridSpec(resolution=resolution)
+    path = grid_path(year, spec, method, weighting)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.save(path, rasterize(year, spec, method, weighting))
+    return spec, np.load(path, mmap_mode='r')
+
+
+def lookup(year, lat, lon, method='idw', resolution=0.05, weighting='equal'):
+    # Interpolated radiance at arbitrary points via direct array reads, NaN outside the grid
+    spec, grid = cached_grid(year, method, resolution, weighting)
+    row, col = spec.cell_index(lat, lon)
+    inside = row >= 0
+    values = np.full(row.shape, np.nan)
+    values[inside] = grid[row[inside], col[inside]]
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute interpolated radiance grids for each year")
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS, help="Years to rasterize")
+    parser.add_argument("--method", choices=METHODS, default='idw', help="Interpolation method")
+    parser.add_argument("--resolution", type=float, default=0.05, help="Grid cell size in degrees")
+    parser.add_argument("--weights", choices=WEIGHTINGS, default='equal',
+                        help="Scale idw neighbours by their cloud-free observation count (cf_cvg)")
+    args = parser.parse_args()
+
+    for year in args.years:
+        start = time.perf_counter()
+        spec, _ = cached_grid(year, args.method, args.resolution, args.weights)
+        print(f"{year}: {spec.shape[0]}x{spec.shape[1]} {args.method} grid "
+              f"ready in {time.perf_counter() - start:.2f}s "
+              f"-> {grid_path(year, spec, args.method, args.weights)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+import xgboost as xgb
+
+from orion import config
+from orion.features import BASIC_FEATURES, build_features, forecast_horizon
+
+model_dir = os.path.join(config.cache_dir, "models")
+legacy_model_file = os.path.join(config.src_root, "Orion_Model", "xgboost_model.pkl")
+
+DEFAULT_MODEL = "xgboost_radiance"
+FEATURES = BASIC_FEATURES  # Column order the notebook model was trained with
+FORMATS = ['ubj', 'json']
+
+
+def model_paths(name):
+    base = os.path.join(model_dir, name)
+    return base, os.path.join(base, "metadata.json")
+
+
+def list_models():
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(name for name in os.listdir(model_dir) if os.path.exists(model_paths(name)[1]))
+
+
+def load_metadata(name=DEFAULT_MODEL):
+    with open(model_paths(name)[1]) as f:
+        return json.load(f)
+
+
+def evaluate(booster, features=FEATURES, years=config.YEARS):
+    # Error over every exported sample; includes the rows the model was trained on
+    from orion.viirs import load_panel
+    panel = load_panel(years, clip=False)
+    X = build_features(panel['Latitude'], panel['Longitude'], panel['Year'], 1, features)
+    error = booster.inplace_predict(X) - panel['avg_rad'].to_numpy()
+    return {
+        'mae': float(np.nanmean(np.abs(error))),
+        'rmse': float(np.sqrt(np.nanmean(error ** 2))),
+        'samples': int(len(error)),
+        'evaluated_on': f"all samples {min(years)}-{max(years)} (includes training data)",
+    }
+
+
+def save_model(booster, name=DEFAULT_MODEL, features=FEATURES, training_years=config.YEARS,
+               metrics=None, params=None, fmt='ubj', source=None, clip=False, horizons=None):
+    # Store a booster in XGBoost's native format next to a metadata sidecar; horizons lists the
+    # years-ahead the model was trained for when its features depend on them
+    base, meta_path = model_paths(name)
+    if os.path.isdir(base):
+        shutil.rmtree(base)
+    os.makedirs(base)
+
+    model_file = f"model.{fmt}"
+    booster.save_model(os.path.join(base, model_file))
+    metadata = {
+        'name': name,
+        'model_file': model_file,
+        'format': fmt,
+        'features': list(features),
+        'training_years': [int(y) for y in training_years],
+        'clip': bool(clip),
+        'horizons': [int(h) for h in horizons] if horizons else None,
+        'metrics': metrics or {},
+        'params': params or {},
+        'num_boosted_rounds': int(booster.num_boosted_rounds()),
+        'xgboost_version': xgb.__version__,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'source': source,
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    load_model.cache_clear()
+    return metadata
+
+
+def import_pickle(path=legacy_model_file, name=DEFAULT_MODEL, training_years=config.YEARS, fmt='ubj',
+                  with_metrics=True):
+    # Convert a joblib-pickled XGBRegressor (as saved by the notebook) into the registry
+    import warnings
+    import joblib
+    with warnings.catch_warnings():
+        # Pickles from older XGBoost versions warn on load; the booster itself converts fine
+        warnings.simplefilter('ignore', UserWarning)
+        booster = joblib.load(path).get_booster()
+    features = booster.feature_names or FEATURES
+    metrics = evaluate(booster, features, training_years) if with_metrics else None
+    return save_model(booster, name, features, training_years, metrics, fmt=fmt,
+                      source=os.path.basename(path))
+
+
+class RegisteredModel:
+    # A loaded booster kept warm for repeated batch predictions
+
+    def __init__(self, name):
+        base, _ = model_paths(name)
+        self.metadata = load_metadata(name)
+        self.features = self.metadata['features']
+        self.latest_year = max(self.metadata['training_years'])
+        self.clip = self.metadata.get('clip', False)
+        # Horizon-dependent models only know the horizons they were trained on
+        self.horizons = None
+        if 'horizon' in self.features:
+            self.horizons = self.metadata.get('horizons') or self.metadata['metrics'].get('horizons') or [1]
+        self.booster = xgb.Booster(model_file=os.path.join(base, self.metadata['model_file']))
+
+    @property
+    def last_forecast_year(self):
+        # Furthest year the model can be asked for, None when it has no horizon limit
+        return None if self.horizons is None else self.latest_year + max(self.horizons)
+
+    def predict(self, lat, lon, year):
+        # Radiance for each (lat, lon, year); scalars broadcast, e.g. many points for one year.
+        # Years past the training data read their history from the latest export.
+        horizon = forecast_horizon(year, self.latest_year)
+        if self.horizons is not None:
+            untrained = np.setdiff1d(horizon, self.horizons)
+            if len(untrained):
+                raise ValueError(f"Model '{self.metadata['name']}' was trained for horizons {self.horizons}, "
+                                 f"not {untrained.tolist()} years past {self.latest_year}")
+        X = build_features(lat, lon, year, horizon, self.features, self.clip)
+        return self.booster.inplace_predict(X)
+
+
+@lru_cache(maxsize=None)
+def load_model(name=DEFAULT_MODEL):
+    # One booster per process; the default model is imported from the notebook pickle on first use
+    if name not in list_models():
+        if name != DEFAULT_MODEL or not os.path.exists(legacy_model_file):
+            raise FileNotFoundError(f"Model '{name}' is not in the registry at {model_dir}")
+        import_pickle(name=name)
+    return RegisteredModel(name)
+
+
+def predict(lat, lon, year, name=DEFAULT_MODEL):
+    return load_model(name).predict(lat, lon, year)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the trained model registry")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Convert a joblib-pickled XGBRegressor into the registry")
+    importer.add_argument("path", nargs="?", default=legacy_model_file)
+    importer.add_argument("--name", default=DEFAULT_MODEL)
+    importer.add_argument("--format", choices=FORMATS, default='ubj')
+    importer.add_argument("--training-years", type=int, nargs="+", default=config.YEARS)
+    importer.add_argument("--no-metrics", action="store_true", help="Skip evaluating the model on the samples")
+
+    commands.add_parser("list", help="Show registered models")
+
+    predictor = commands.add_parser("predict", help="Predict radiance at one or more points")
+    predictor.add_argument("--name", default=DEFAULT_MODEL)
+    predictor.add_argument("--lat", type=float, nargs="+", required=True)
+    predictor.add_argument("--lon", type=float, nargs="+", required=True)
+    predictor.add_argument("--year", type=int, nargs="+", required=True)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        start = time.perf_counter()
+        metadata = import_pickle(args.path, args.name, args.training_years, args.format,
+                                 with_metrics=not args.no_metrics)
+        print(f"Imported {args.path} as '{args.name}' in {time.perf_counter() - start:.2f}s")
+        print(json.dumps(metadata['metrics'], indent=2))
+    elif args.command == "list":
+        for name in list_models():
+            metadata = load_metadata(name)
+            print(f"{name}: {metadata['format']}, features {metadata['features']}, "
+                  f"years {metadata['training_years'][0]}-{metadata['training_years'][-1]}, "
+                  f"metrics {metadata['metrics']}")
+    else:
+        start = time.perf_counter()
+        values = predict(args.lat, args.lon, args.year, args.name)
+        elapsed = time.perf_counter() - start
+        for lat, lon, year, value in zip(*np.broadcast_arrays(args.lat, args.lon, args.year), values):
+            print(f"{lat:.4f}, {lon:.4f} ({year}): {value:.3f} nW/cm²/sr")
+        print(f"Predicted in {elapsed * 1000:.1f} ms (including model load)")
+
+
+if __name__ == "__main__":
+    main()
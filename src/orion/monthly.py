@@ -0,0 +1,254 @@
+import argparse
+import os
+import re
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from orion import catalog, config
+from orion.coverage import WEIGHTINGS, point_weights
+from orion.spatial import PointIndex
+from orion.viirs import available_years as viirs_years, extract_coords, inside_boundary, load_panel
+
+# Monthly VIIRS exports carry one `<YYYYMMDD>_avg_rad` column per month, the band names
+# ImageCollection.toBands() produces, and optionally a matching `<YYYYMMDD>_cf_cvg` count of
+# cloud-free observations. Each year is ingested once into compact (points, 12) float32 arrays;
+# every coarser granularity is a (months, periods) weight matrix applied to them, and the resulting
+# per-point aggregates are cached per granularity and weighting. Rolling windows run over the
+# multi-year month axis: a year's first windows reach back into the previous year's last months.
+
+BAND_PATTERN = re.compile(r"^(\d{4})(\d{2})\d{2}_(avg_rad|cf_cvg)$")
+MONTHS = 12
+# India Meteorological Department seasons, each inside one calendar year
+SEASONS = {
+    'Winter': [1, 2],
+    'Pre-monsoon': [3, 4, 5],
+    'Monsoon': [6, 7, 8, 9],
+    'Post-monsoon': [10, 11, 12],
+}
+ROLLING_MONTHS = 3  # Trailing window of the rolling granularity
+# A year's sample and the previous year's are the same point when this close (exports round coordinates)
+SAME_POINT_M = 1.0
+GRANULARITIES = ['annual', 'seasonal', 'monthly', 'rolling']
+
+
+def monthly_path(year):
+    return catalog.resolve('viirs_monthly', year)
+
+
+def available_years(years=config.YEARS):
+    return [year for year in years if catalog.candidates('viirs_monthly', year)]
+
+
+def store_path(year, suffix=".npz"):
+    # Keyed by file content like the annual columnar cache
+    return catalog.cache_path(monthly_path(year), "viirs_monthly", suffix)
+
+
+def build_store(year):
+    # Parse one year's monthly export into coordinates, boundary mask and (points, 12) radiance
+    # and coverage arrays; months without a cf_cvg column get NaN counts
+    df = pd.read_csv(monthly_path(year))
+    bands = {'avg_rad': {}, 'cf_cvg': {}}
+    for column in df.columns:
+        match = BAND_PATTERN.match(column)
+        if match:
+            bands[match.group(3)][int(match.group(2))] = column
+    if not bands['avg_rad']:
+        raise ValueError(f"{monthly_path(year)} has no <YYYYMMDD>_avg_rad columns")
+
+    lat, lon = extract_coords(df['.geo'])
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    inside = np.zeros(len(df), dtype=bool)
+    inside[valid] = inside_boundary(lat[valid], lon[valid])
+
+    store = {'lat': lat, 'lon': lon, 'inside': inside, 'valid': valid}
+    for band, columns in bands.items():
+        values = np.full((len(df), MONTHS), np.nan, dtype=np.float32)
+        for month, column in columns.items():
+            values[:, month - 1] = pd.to_numeric(df[column], errors='coerce').to_numpy()
+        store[band] = values
+    path = store_path(year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **store)
+    return store
+
+
+def load_store(year):
+    path = store_path(year)
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            # Stores written before coverage was ingested are rebuilt
+            if 'cf_cvg' in cached.files:
+                return {name: cached[name] for name in cached.files}
+    return build_store(year)
+
+
+def lead_months(granularity):
+    # Months of the previous year the granularity's periods reach back into
+    return ROLLING_MONTHS - 1 if granularity == 'rolling' else 0
+
+
+def period_weights(granularity):
+    # Period names and the (lead + 12, periods) 0/1 matrix selecting each period's months; the
+    # first `lead_months` rows are the previous year's last months
+    if granularity == 'annual':
+        return [''], np.ones((MONTHS, 1), dtype=np.float32)
+    if granularity == 'monthly':
+        return [f"{month:02d}" for month in range(1, MONTHS + 1)], np.eye(MONTHS, dtype=np.float32)
+
+    if granularity == 'seasonal':
+        groups = SEASONS
+    elif granularity == 'rolling':
+        groups = {f"{end:02d}": list(range(end - ROLLING_MONTHS + 1, end + 1))
+                  for end in range(1, MONTHS + 1)}
+    else:
+        raise ValueError(f"Unknown granularity '{granularity}' (known: {', '.join(GRANULARITIES)})")
+    lead = lead_months(granularity)
+    weights = np.zeros((lead + MONTHS, len(groups)), dtype=np.float32)
+    for i, months in enumerate(groups.values()):
+        weights[np.asarray(months) - 1 + lead, i] = 1
+    return list(groups), weights
+
+
+def period_times(granularity):
+    # Fractional-year offset of each period's middle, for plotting periods on one time axis
+    _, weights = period_weights(granularity)
+    months = np.arange(1 - lead_months(granularity), MONTHS + 1)
+    middle = (weights * months[:, None]).sum(axis=0) / weights.sum(axis=0)
+    return (middle - 0.5) / MONTHS
+
+
+def previous_months(year, lead, store):
+    # The previous year's last `lead` months at this year's points, and which points have them.
+    # Only a sample at the same point counts: exports seeded alike share their points, while
+    # the default per-year seeds put the nearest sample at another pixel, often tens of km away.
+    n_points = len(store['lat'])
+    months = {band: np.full((n_points, lead), np.nan, dtype=np.float32) for band in ('avg_rad', 'cf_cvg')}
+    same = np.zeros(n_points, dtype=bool)
+    if not lead or not catalog.candidates('viirs_monthly', year - 1):
+        return months, same
+    previous = load_store(year - 1)
+    valid = np.flatnonzero(previous['valid'])
+    distance, idx = PointIndex(previous['lat'][valid], previous['lon'][valid]).query(
+        np.nan_to_num(store['lat']), np.nan_to_num(store['lon']), workers=-1)
+    same = (distance <= SAME_POINT_M) & store['valid']
+    for band, values in months.items():
+        values[same] = previous[band][valid[idx[same]], MONTHS - lead:]
+    return months, same
+
+
+def weighted_means(values, weights, coverage=None):
+    # Mean of the available months in each period as two matrix products; NaN when none are.
+    # With coverage, every month counts in proportion to its cloud-free observations.
+    valid = ~np.isnan(values)
+    month_weights = valid.astype(np.float32)
+    if coverage is not None:
+        month_weights *= point_weights(coverage).astype(np.float32)
+    sums = (np.where(valid, values, 0) * month_weights) @ weights
+    totals = month_weights @ weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, sums / totals, np.nan).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def aggregate(year, granularity='annual', weighting='equal'):
+    # (points, periods) means for one year, from the on-disk cache when this granularity ran before.
+    # Periods reaching into the previous year are also keyed by that year's export.
+    lead = lead_months(granularity)
+    suffix = f"_{granularity}{ROLLING_MONTHS if granularity == 'rolling' else ''}_{weighting}"
+    if lead and catalog.candidates('viirs_monthly', year - 1):
+        suffix += f"_after_{catalog.content_hash(monthly_path(year - 1))[:20]}"
+    path = store_path(year, f"{suffix}.npy")
+    if os.path.exists(path):
+        return np.load(path)
+    _, weights = period_weights(granularity)
+    store = load_store(year)
+    previous, same = previous_months(year, lead, store)
+    values = np.hstack([previous['avg_rad'], store['avg_rad']])
+    coverage = np.hstack([previous['cf_cvg'], store['cf_cvg']]) if weighting == 'coverage' else None
+    means = weighted_means(values, weights, coverage)
+    # Windows reaching back to months this point has no export for would be shorter means under
+    # the same label, so they are left out (NaN) instead, e.g. January and February of the first year
+    reaches_back = weights[:lead].any(axis=0)
+    means[np.ix_(~same, reaches_back)] = np.nan
+    np.save(path, means)
+    return means
+
+
+def time_keys(granularity):
+    # Columns identifying one time step of load_series, in chronological sort order
+    return ('Year',) if granularity == 'annual' else ('Time', 'Period')
+
+
+def period_label(year, name):
+    if not name:
+        return str(year)
+    return f"{year}-{name}" if name[0].isdigit() else f"{year} {name}"
+
+
+def load_periods(years=config.YEARS, granularity='annual', clip=True, weighting='equal'):
+    # Long (point, period) frame with Period labels and a fractional-year Time, like load_panel
+    names, _ = period_weights(granularity)
+    offsets = period_times(granularity)
+    frames = []
+    for year in years:
+        store = load_store(year)
+        keep = store['inside'] if clip else store['valid']
+        means = aggregate(year, granularity, weighting)[keep]
+        n_points = len(means)
+        frame = pd.DataFrame({
+            'Year': year,
+            'Period': np.repeat([period_label(year, name) for name in names], n_points),
+            'Time': np.repeat(year + offsets, n_points),
+            'Latitude': np.tile(store['lat'][keep], len(names)),
+            'Longitude': np.tile(store['lon'][keep], len(names)),
+            'avg_rad': means.T.ravel(),
+        })
+        frames.append(frame[~np.isnan(frame['avg_rad'].to_numpy())])
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_series(years=config.YEARS, granularity='annual', weighting='equal', clip=True):
+    # Samples per time step: the annual exports for 'annual' (with cf_cvg for coverage weighting),
+    # otherwise the periods of the monthly exports; years without an export are left out
+    if granularity == 'annual':
+        return load_panel(viirs_years(years), clip, coverage=weighting == 'coverage')
+    return load_periods(available_years(years), granularity, clip, weighting)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate monthly VIIRS exports to annual, seasonal, "
+                                                 "monthly or rolling periods")
+    parser.add_argument("--granularity", choices=GRANULARITIES, default='seasonal')
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS)
+    parser.add_argument("--no-clip", action="store_true", help="Keep samples outside the India boundary")
+    parser.add_argument("--weights", choices=WEIGHTINGS, default='equal',
+                        help="Weight months by their cloud-free observation count (cf_cvg)")
+    parser.add_argument("-o", "--output", default=None, help="CSV of per-period statistics")
+    args = parser.parse_args()
+
+    years = available_years(args.years)
+    if not years:
+        parser.error("No monthly exports found; create them with `python -m orion.sampler --monthly` "
+                     "or the monthly export in earth_engine.js")
+
+    start = time.perf_counter()
+    panel = load_periods(years, args.granularity, clip=not args.no_clip, weighting=args.weights)
+    elapsed = time.perf_counter() - start
+
+    stats = panel.groupby(['Period', 'Time'], sort=False)['avg_rad'].agg(['mean', 'median', 'count']).reset_index()
+    weighted = '_coverage' if args.weights == 'coverage' else ''
+    output = args.output or os.path.join(config.analysis_dir, f"monthly_{args.granularity}{weighted}_stats.csv")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    stats.to_csv(output, index=False)
+
+    print(stats.to_string(index=False, float_format='%.3f'))
+    print(f"\n{len(panel)} point-periods from {len(years)} years in {elapsed:.2f}s")
+    print(f"Results have been saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from orion.kde import binned_kde, save_curves, load_curves
+from orion.outliers import detect
+from orion.render import reusable_figure
+
+# Robust statistics with and without outliers for All India and East India, the per-year
+# distribution plots and the trend plots, shared by analyze_without_outliers.py and orion.analyze
+
+EAST_LONGITUDE = 85  # East India: samples east of this longitude
+SERIES = ['all_with_outliers', 'all_clean', 'east_with_outliers', 'east_clean']
+METRICS = ['mean', 'median', 'trimmed_mean_5', 'trimmed_mean_10']
+REGIONS = ['all_clean', 'east_clean']
+
+
+def outlier_masks(panel, detector):
+    # Inlier masks for All India and East India for every year in one pass
+    keep_all = detect(panel, detector, by=('Year',))
+    east = (panel['Longitude'] > EAST_LONGITUDE).to_numpy()
+    keep_east = np.zeros(len(panel), dtype=bool)
+    keep_east[east] = detect(panel[east], detector, by=('Year',))
+    return keep_all, keep_east
+
+
+def calculate_robust_stats(data):
+    return {
+        'mean': data.mean(),
+        'median': data.median(),
+        'trimmed_mean_5': stats.trim_mean(data, 0.05),  # 5% trimmed mean
+        'trimmed_mean_10': stats.trim_mean(data, 0.10),  # 10% trimmed mean
+        'std': data.std(),
+        'mad': stats.median_abs_deviation(data),  # Median Absolute Deviation
+        'q1': data.quantile(0.25),
+        'q3': data.quantile(0.75),
+        'min': data.min(),
+        'max': data.max(),
+        'count': len(data)
+    }
+
+
+def analyze_year(panel, keep_all, keep_east, year):
+    # Radiance of every series in one year with its robust statistics
+    in_year = (panel['Year'] == year).to_numpy()
+    gdf = panel[in_year]
+    east = (gdf['Longitude'] > EAST_LONGITUDE).to_numpy()
+    series = {
+        'all_with_outliers': gdf['avg_rad'],
+        'all_clean': gdf.loc[keep_all[in_year], 'avg_rad'],
+        'east_with_outliers': gdf.loc[east, 'avg_rad'],
+        'east_clean': gdf.loc[keep_east[in_year], 'avg_rad'],
+    }
+    series['stats'] = {name: calculate_robust_stats(series[name]) for name in SERIES}
+    return series
+
+
+def distribution_curves(yearly_data, curves_file):
+    # Density curves for every year and series in one batched KDE pass
+    labels = [f"{year}/{series}" for year in yearly_data for series in SERIES]
+    datasets = [yearly_data[year][series] for year in yearly_data for series in SERIES]
+    grid, density, bandwidths = binned_kde(datasets)
+    save_curves(curves_file, labels, grid, density, bandwidths)
+    return load_curves(curves_file)
+
+
+def year_curves(curves, year):
+    # Only the curves one year's plot needs, to keep what is sent to render workers small
+    return {label: curve for label, curve in curves.items() if label.startswith(f"{year}/")}
+
+
+def plot_distributions(curves, year, output_dir):
+    fig = reusable_figure((15, 10))
+
+    for position, (region, name) in enumerate([('all', 'All India'), ('east', 'East India')], start=1):
+        ax = fig.add_subplot(2, 1, position)
+        for series, label, color in [('with_outliers', 'With Outliers', 'blue'),
+                                     ('clean', 'Without Outliers', 'red')]:
+            grid, density = curves[f"{year}/{region}_{series}"]
+            ax.plot(grid, density, label=label, color=color, alpha=0.5)
+        ax.set_title(f'Distribution of Radiance Values - {name} ({year})')
+        ax.set_xlabel('Radiance')
+        ax.set_ylabel('Density')
+        ax.legend()
+
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, f'distributions_{year}.png'))
+
+
+def robust_trends(yearly_data):
+    # {'all_clean': {metric: [values per year]}, 'east_clean': {...}}
+    return {
+        region: {metric: [data['stats'][region][metric] for data in yearly_data.values()] for metric in METRICS}
+        for region in REGIONS
+    }
+
+
+def plot_trends(years, trends, output_dir):
+    fig = reusable_figure((15, 10))
+
+    for position, (region, name) in enumerate([('all_clean', 'All India'), ('east_clean', 'East India')], start=1):
+        ax = fig.add_subplot(2, 1, position)
+        for metric, values in trends[region].items():
+            ax.plot(years, values, marker='o', label=metric.replace('_', ' ').title())
+        ax.set_title(f'Trends in {name} (Without Outliers)')
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Radiance')
+        ax.legend()
+
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, 'robust_trends.png'))
+
+
+def summary_table(yearly_data):
+    summary_data = []
+    for year, data in yearly_data.items():
+        year_stats = data['stats']
+        summary_data.append({
+            'Year': year,
+            'All India Mean (Clean)': year_stats['all_clean']['mean'],
+            'All India Median (Clean)': year_stats['all_clean']['median'],
+            'All India 5% Trimmed Mean': year_stats['all_clean']['trimmed_mean_5'],
+            'East Mean (Clean)': year_stats['east_clean']['mean'],
+            'East Median (Clean)': year_stats['east_clean']['median'],
+            'East 5% Trimmed Mean': year_stats['east_clean']['trimmed_mean_5'],
+            'All Points Count': year_stats['all_with_outliers']['count'],
+            'Clean Points Count': year_stats['all_clean']['count'],
+            'Outliers Removed': (year_stats['all_with_outliers']['count'] -
+                                 year_stats['all_clean']['count'])
+        })
+    return pd.DataFrame(summary_data)
+
+
+def report_html(summary_df):
+    return f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Light Pollution Analysis (Without Outliers)</title>
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 20px; }}
+                .container {{ max-width: 1200px; margin: 0 auto; }}
+                .plot {{ margin: 20px 0; }}
+                table {{ border-collapse: collapse; width: 100%; }}
+                th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+                th {{ background-color: #f2f2f2; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <h1>Light Pollution Analysis (Without Outliers)</h1>
+                <div class="plot">
+                    <h2>Trends in All India and East India</h2>
+                    <img src="robust_trends.png" alt="Robust Trends">
+                </div>
+                <div class="plot">
+                    <h2>Summary Statistics</h2>
+                    {summary_df.to_html()}
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+
+def write_outputs(panel, keep_all, keep_east, scheduler, output_dir):
+    # Per-year statistics, the summary CSV and report, and queued distribution and trend plots.
+    # Plots are rendered by the caller's scheduler.run().
+    years = sorted(panel['Year'].unique().tolist())
+    yearly_data = {year: analyze_year(panel, keep_all, keep_east, year) for year in years}
+
+    curves = distribution_curves(yearly_data, os.path.join(output_dir, "distribution_curves.npz"))
+    for year in years:
+        scheduler.submit('png', plot_distributions, year_curves(curves, year), year, output_dir)
+    scheduler.submit('png', plot_trends, years, robust_trends(yearly_data), output_dir)
+
+    summary_df = summary_table(yearly_data)
+    summary_df.to_csv(os.path.join(output_dir, 'outlier_analysis_summary.csv'), index=False)
+    if scheduler.wants('html'):
+        with open(os.path.join(output_dir, 'outlier_analysis.html'), 'w') as f:
+            f.write(report_html(summary_df))
+    return yearly_data, summary_df
@@ -0,0 +1,241 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from orion.spatial import to_unit_xyz, meters_to_chord
+
+# Tukey fences: values beyond Q1 - 1.5 IQR or Q3 + 1.5 IQR are outliers
+IQR_FACTOR = 1.5
+# Hampel filter: values further than 3 scaled MADs from the median are outliers
+HAMPEL_THRESHOLD = 3.0
+MAD_SCALE = 1.4826  # Makes the MAD a consistent estimator of the standard deviation
+
+
+def group_codes(groups, n):
+    # Integer code per value for one key array or a list of key arrays (e.g. [year, region])
+    if groups is None:
+        return np.zeros(n, dtype=np.int64), np.array([None], dtype=object)
+    if isinstance(groups, (list, tuple)):
+        groups = pd.MultiIndex.from_arrays([np.asarray(g) for g in groups])
+    codes, labels = pd.factorize(groups, use_na_sentinel=False)
+    return codes.astype(np.int64), np.asarray(labels)
+
+
+def group_quantiles(values, codes, n_groups, quantiles):
+    # Linear-interpolated quantiles for every group at once from a single sort, NaNs ignored
+    valid = ~np.isnan(values)
+    v = values[valid]
+    c = codes[valid]
+    order = np.lexsort((v, c))
+    v = v[order]
+
+    counts = np.bincount(c, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+
+    quantiles = np.asarray(quantiles, dtype=float)
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    has_data = counts > 0
+    if not has_data.any():
+        return result
+
+    pos = quantiles[None, :] * (counts[has_data, None] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, counts[has_data, None] - 1)
+    frac = pos - lo
+    base = starts[has_data, None]
+    result[has_data] = v[base + lo] + frac * (v[base + hi] - v[base + lo])
+    return result
+
+
+def iqr_bounds(values, codes, n_groups, factor=IQR_FACTOR):
+    q = group_quantiles(values, codes, n_groups, [0.25, 0.75])
+    iqr = q[:, 1] - q[:, 0]
+    return q[:, 0] - factor * iqr, q[:, 1] + factor * iqr
+
+
+def hampel_bounds(values, codes, n_groups, threshold=HAMPEL_THRESHOLD):
+    median = group_quantiles(values, codes, n_groups, [0.5])[:, 0]
+    deviation = np.abs(values - median[codes])
+    mad = group_quantiles(deviation, codes, n_groups, [0.5])[:, 0] * MAD_SCALE
+    return median - threshold * mad, median + threshold * mad
+
+
+BOUNDS = {
+    'iqr': iqr_bounds,
+    'hampel': hampel_bounds,
+}
+
+
+def outlier_bounds(values, groups=None, method='iqr', **kwargs):
+    # Lower/upper bounds per group, returned with the group labels they belong to
+    values = np.asarray(values, dtype=float)
+    codes, labels = group_codes(groups, len(values))
+    lower, upper = BOUNDS[method](values, codes, len(labels), **kwargs)
+    return labels, lower, upper
+
+
+def inlier_mask(values, groups=None, method='iqr', **kwargs):
+    # Boolean mask of values inside their group's bounds; NaNs are never inliers
+    values = np.asarray(values, dtype=float)
+    codes, labels = group_codes(groups, len(values))
+    lower, upper = BOUNDS[method](values, codes, len(labels), **kwargs)
+    return (values >= lower[codes]) & (values <= upper[codes])
+
+
+def iqr_mask(values, groups=None, factor=IQR_FACTOR):
+    return inlier_mask(values, groups, 'iqr', factor=factor)
+
+
+class StreamingIQR:
+    # Approximate per-group IQR bounds over chunked input using fixed histogram sketches.
+    # Bins are uniform in arcsinh(value), so relative precision stays constant from
+    # near-zero to very bright radiance; quantiles are exact to within one bin.
+
+    def __init__(self, factor=IQR_FACTOR, n_bins=8192, limit=1e6):
+        self.factor = factor
+        self.edges = np.linspace(-np.arcsinh(limit), np.arcsinh(limit), n_bins + 1)
+        self.labels = {}
+        self.counts = np.zeros((0, n_bins), dtype=np.int64)
+
+    def rows(self, groups, n):
+        # Histogram row for each value, growing the table for groups seen for the first time.
+        # Groups are coded like the batch functions, so [year, region] key lists work here too.
+        codes, labels = group_codes(groups, n)
+        labels = labels.tolist()
+        for label in labels:
+            self.labels.setdefault(label, len(self.labels))
+        if len(self.labels) > len(self.counts):
+            grow = np.zeros((len(self.labels) - len(self.counts), self.counts.shape[1]), dtype=np.int64)
+            self.counts = np.vstack([self.counts, grow])
+        return np.array([self.labels[label] for label in labels], dtype=np.int64)[codes]
+
+    def update(self, values, groups=None):
+        values = np.asarray(values, dtype=float)
+        rows = self.rows(groups, len(values))
+        valid = ~np.isnan(values)
+        n_bins = self.counts.shape[1]
+        bins = np.clip(np.searchsorted(self.edges, np.arcsinh(values[valid]), side='right') - 1, 0, n_bins - 1)
+        flat = np.bincount(rows[valid] * n_bins + bins, minlength=self.counts.size)
+        self.counts += flat.reshape(self.counts.shape)
+        return self
+
+    def quantiles(self, quantiles):
+        # Interpolate inside the bin holding each target rank, for every group at once
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        result = np.full((len(total), len(quantiles)), np.nan)
+        for j, q in enumerate(quantiles):
+            target = q * total
+            b = np.minimum((cumulative < target[:, None]).sum(axis=1), self.counts.shape[1] - 1)
+            before = np.where(b > 0, cumulative[np.arange(len(b)), b - 1], 0)
+            in_bin = np.maximum(self.counts[np.arange(len(b)), b], 1)
+            frac = np.clip((target - before) / in_bin, 0, 1)
+            edge = self.edges[b] + frac * (self.edges[b + 1] - self.edges[b])
+            result[:, j] = np.where(total > 0, np.sinh(edge), np.nan)
+        return result
+
+    def bounds(self):
+        # Group labels with their lower/upper bounds
+        q = self.quantiles([0.25, 0.75])
+        iqr = q[:, 1] - q[:, 0]
+        labels = list(self.labels)
+        return labels, q[:, 0] - self.factor * iqr, q[:, 1] + self.factor * iqr
+
+    def mask(self, values, groups=None):
+        # Inlier mask for a chunk, using bounds accumulated from every chunk seen so far
+        values = np.asarray(values, dtype=float)
+        rows = self.rows(groups, len(values))
+        _, lower, upper = self.bounds()
+        return (values >= lower[rows]) & (values <= upper[rows])
+
+
+# ----------------------------
+# Detectors
+# ----------------------------
+ROBUST_Z_THRESHOLD = 3.5  # Iglewicz & Hoaglin cut-off for the modified z-score
+LOCAL_RADIUS_M = 50000
+LOCAL_NEIGHBOURS = 16
+
+
+def robust_z_mask(values, groups=None, threshold=ROBUST_Z_THRESHOLD):
+    # Modified z-score 0.6745 * (x - median) / MAD per group
+    values = np.asarray(values, dtype=float)
+    codes, labels = group_codes(groups, len(values))
+    median = group_quantiles(values, codes, len(labels), [0.5])[:, 0]
+    deviation = values - median[codes]
+    mad = group_quantiles(np.abs(deviation), codes, len(labels), [0.5])[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = 0.6745 * deviation / mad[codes]
+    z = np.where(deviation == 0, 0.0, z)
+    return np.abs(z) <= threshold
+
+
+def quantile_clip_mask(values, groups=None, lower=0.01, upper=0.99):
+    # Keep values between the per-group lower and upper quantiles
+    values = np.asarray(values, dtype=float)
+    codes, labels = group_codes(groups, len(values))
+    q = group_quantiles(values, codes, len(labels), [lower, upper])
+    return (values >= q[codes, 0]) & (values <= q[codes, 1])
+
+
+def local_outlier_mask(lat, lon, values, groups=None, radius_m=LOCAL_RADIUS_M,
+                       k=LOCAL_NEIGHBOURS, threshold=ROBUST_Z_THRESHOLD, min_neighbours=3):
+    # Robust z-score against each point's neighbours within `radius_m` in the same group.
+    # Groups become a fourth KD-tree coordinate spaced far beyond any chord length, so one
+    # k-NN query over the whole panel never mixes neighbours from different groups.
+    values = np.asarray(values, dtype=float)
+    codes, _ = group_codes(groups, len(values))
+    coords = np.column_stack([to_unit_xyz(lat, lon), codes * 10.0])
+    tree = cKDTree(coords)
+
+    k = min(k + 1, len(values))
+    chord, idx = tree.query(coords, k=k)
+    chord, idx = chord[:, 1:], idx[:, 1:]  # Drop the point itself
+
+    neighbours = np.where(chord <= meters_to_chord(radius_m), values[idx], np.nan)
+    enough = np.sum(~np.isnan(neighbours), axis=1) >= min_neighbours
+
+    # Points without neighbours in range produce all-NaN rows; they are kept below
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(neighbours, axis=1)
+        mad = np.nanmedian(np.abs(neighbours - median[:, None]), axis=1)
+        deviation = values - median
+        z = np.where(deviation == 0, 0.0, 0.6745 * deviation / mad)
+
+    keep = ~np.isnan(values)
+    keep[enough] &= np.abs(z[enough]) <= threshold
+    return keep
+
+
+DETECTORS = {
+    'iqr': lambda panel, groups, **kwargs: iqr_mask(panel['avg_rad'], groups, **kwargs),
+    'hampel': lambda panel, groups, **kwargs: inlier_mask(panel['avg_rad'], groups, 'hampel', **kwargs),
+    'mad': lambda panel, groups, **kwargs: robust_z_mask(panel['avg_rad'], groups, **kwargs),
+    'quantile': lambda panel, groups, **kwargs: quantile_clip_mask(panel['avg_rad'], groups, **kwargs),
+    'local': lambda panel, groups, **kwargs: local_outlier_mask(
+        panel['Latitude'], panel['Longitude'], panel['avg_rad'], groups, **kwargs),
+}
+
+
+def detect(panel, method='iqr', by=('Year',), **kwargs):
+    # Inlier mask for a whole multi-year panel, with bounds computed per `by` group in one pass
+    groups = [panel[column].to_numpy() for column in by] if by else None
+    return np.asarray(DETECTORS[method](panel, groups, **kwargs))
+
+
+def compare_detectors(panel, methods, by=('Year',)):
+    # Points kept and removed by each detector, per group, from the same in-memory panel
+    rows = []
+    for method in methods:
+        keep = detect(panel, method, by)
+        summary = pd.DataFrame({column: panel[column].to_numpy() for column in by})
+        summary['Kept'] = keep
+        summary = summary.groupby(list(by))['Kept'].agg(['size', 'sum']).reset_index()
+        summary = summary.rename(columns={'size': 'Points', 'sum': 'Kept'})
+        summary['Removed'] = summary['Points'] - summary['Kept']
+        summary.insert(0, 'Detector', method)
+        rows.append(summary)
+    return pd.concat(rows, ignore_index=True)
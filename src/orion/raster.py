@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from orion import catalog, config
+from orion.coverage import WEIGHTINGS
+from orion.interpolate import METHODS, GridSpec, cached_grid
+from orion.viirs import inside_boundary, viirs_path
+
+raster_dir = os.path.join(config.cache_dir, "rasters")
+
+# Suitability classes stored in the class raster
+NO_DATA = 0
+SUITABLE = 1
+UNSUITABLE = 2
+CLASS_NAMES = {NO_DATA: 'no data', SUITABLE: 'suitable', UNSUITABLE: 'unsuitable'}
+
+
+def raster_paths(year, resolution=0.05, method='idw', threshold=config.DARK_SKY_THRESHOLD,
+                 weighting='equal'):
+    # Keyed by the export's content and every build parameter, so a re-exported year or a
+    # different resolution, method, threshold or weighting gets its own files
+    spec = GridSpec(resolution=resolution)
+    suffix = '' if weighting == 'equal' else f"_{weighting}"
+    base = catalog.cache_path(viirs_path(year), "rasters", f"_{method}_{spec.key}_{threshold:g}{suffix}")
+    return base + "_radiance.npy", base + "_class.npy", base + ".json"
+
+
+def geotransform(spec):
+    # GDAL-style affine transform: x = x0 + col * dx, y = y0 + row * dy (dy negative, north-up)
+    return [spec.west, spec.resolution, 0.0, spec.north, 0.0, -spec.resolution]
+
+
+def build_raster(year, resolution=0.05, method='idw', threshold=config.DARK_SKY_THRESHOLD,
+                 weighting='equal'):
+    # Interpolate the year's samples onto a national grid, mask it to the boundary and classify it
+    # Reuses the interpolated grid cached for interpolate.lookup, clipped at 0 like score_year
+    # because kriging can overshoot below it
+    spec, radiance = cached_grid(year, method, resolution, weighting)
+    radiance = np.maximum(radiance, 0)
+
+    lat, lon = spec.centers()
+    grid_lon, grid_lat = np.meshgrid(lon, lat)
+    inside = inside_boundary(grid_lat, grid_lon)
+
+    os.makedirs(raster_dir, exist_ok=True)
+    radiance_path, class_path, meta_path = raster_paths(year, resolution, method, threshold, weighting)
+
+    # Write through memory maps so readers can open the same files without loading them
+    radiance_map = np.lib.format.open_memmap(radiance_path, mode='w+', dtype=np.float32, shape=spec.shape)
+    radiance_map[:] = np.where(inside, radiance, np.nan)
+    radiance_map.flush()
+
+    class_map = np.lib.format.open_memmap(class_path, mode='w+', dtype=np.uint8, shape=spec.shape)
+    class_map[:] = np.where(inside, np.where(radiance > threshold, UNSUITABLE, SUITABLE), NO_DATA)
+    class_map.flush()
+
+    metadata = {
+        'year': year,
+        'shape': list(spec.shape),
+        'geotransform': geotransform(spec),
+        'crs': 'EPSG:4326',
+        'method': method,
+        'threshold': threshold,
+        'weighting': weighting,
+        'classes': {str(value): name for value, name in CLASS_NAMES.items()},
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+class SuitabilityRaster:
+    # Memory-mapped radiance and suitability rasters for one year
+
+    def __init__(self, year, resolution=0.05, method='idw', threshold=config.DARK_SKY_THRESHOLD,
+                 weighting='equal'):
+        radiance_path, class_path, meta_path = raster_paths(year, resolution, method, threshold, weighting)
+        with open(meta_path) as f:
+            self.metadata = json.load(f)
+        self.radiance = np.load(radiance_path, mmap_mode='r')
+        self.classes = np.load(class_path, mmap_mode='r')
+        self.x0, self.dx, _, self.y0, _, self.dy = self.metadata['geotransform']
+
+    def pixel(self, lat, lon):
+        # Invert the geotransform; pixels outside the raster come back as -1
+        row = np.floor((np.asarray(lat, dtype=float) - self.y0) / self.dy).astype(np.int64)
+        col = np.floor((np.asarray(lon, dtype=float) - self.x0) / self.dx).astype(np.int64)
+        n_rows, n_cols = self.radiance.shape
+        outside = (row < 0) | (row >= n_rows) | (col < 0) | (col >= n_cols)
+        return np.where(outside, -1, row), np.where(outside, -1, col)
+
+    def sample(self, lat, lon):
+        # Radiance and suitability class at each point
+        row, col = self.pixel(lat, lon)
+        inside = row >= 0
+        radiance = np.full(row.shape, np.nan, dtype=np.float32)
+        classes = np.full(row.shape, NO_DATA, dtype=np.uint8)
+        radiance[inside] = self.radiance[row[inside], col[inside]]
+        classes[inside] = self.classes[row[inside], col[inside]]
+        return radiance, classes
+
+
+@lru_cache(maxsize=None)
+def load_raster(year, resolution=0.05, method='idw', threshold=config.DARK_SKY_THRESHOLD,
+                weighting='equal'):
+    # Open a year's raster, building it first if this data and these parameters have none yet
+    if not os.path.exists(raster_paths(year, resolution, method, threshold, weighting)[2]):
+        build_raster(year, resolution, method, threshold, weighting)
+    return SuitabilityRaster(year, resolution, method, threshold, weighting)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build national radiance and dark-sky suitability rasters")
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS, help="Years to build")
+    parser.add_argument("--resolution", type=float, default=0.05, help="Cell size in degrees")
+    parser.add_argument("--method", choices=METHODS, default='idw', help="Interpolation method")
+    parser.add_argument("--threshold", type=float, default=config.DARK_SKY_THRESHOLD,
+                        help="Radiance above this is considered unsuitable")
+    parser.add_argument("--weights", choices=WEIGHTINGS, default='equal',
+                        help="Scale idw neighbours by their cloud-free observation count (cf_cvg)")
+    args = parser.parse_args()
+
+    for year in args.years:
+        start = time.perf_counter()
+        metadata = build_raster(year, args.resolution, args.method, args.threshold, args.weights)
+        rows, cols = metadata['shape']
+        print(f"{year}: {rows}x{cols} raster built in {time.perf_counter() - start:.2f}s")
+
+    print(f"Rasters have been saved to {raster_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import numpy as np
+
+REGIONS = ['North', 'South', 'West', 'East', 'Central']
+
+
+def assign_regions(lat, lon):
+    # Same rules as the per-row assign_region in the temporal analysis scripts, vectorized
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    return np.select(
+        [lat > 28, lat < 18, lon < 78, lon > 85],
+        ['North', 'South', 'West', 'East'],
+        default='Central'
+    )
@@ -0,0 +1,79 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+FORMATS = ['png', 'html', 'json']
+
+# Figures kept alive per worker process, keyed by size, and cleared between uses
+_figures = {}
+
+
+def parse_formats(value):
+    # "png,html" -> {'png', 'html'}; unknown names are rejected early
+    formats = {name.strip().lower() for name in value.split(',') if name.strip()}
+    unknown = formats - set(FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown output formats: {', '.join(sorted(unknown))} (choose from {', '.join(FORMATS)})")
+    return formats
+
+
+def use_agg():
+    # Non-interactive backend: no GUI event loop and safe to use from worker processes
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def reusable_figure(figsize):
+    # A cleared figure of the given size, reused across renders in the same process.
+    # Safe as long as callers save the figure before requesting another one of the same size.
+    import matplotlib.pyplot as plt
+    fig = _figures.get(figsize)
+    if fig is None:
+        fig = _figures[figsize] = plt.figure(figsize=figsize)
+    else:
+        fig.clf()
+    return fig
+
+
+def save_folium(m, path):
+    m.save(path)
+    return path
+
+
+class RenderScheduler:
+    # Collects independent figure renders and runs them in a process pool with the Agg backend.
+    # Tasks whose output format is not enabled are skipped without being built.
+
+    def __init__(self, formats=('png', 'html'), workers=None):
+        self.formats = set(formats)
+        self.workers = workers if workers is not None else min(os.cpu_count() or 1, 8)
+        self.tasks = []
+
+    def wants(self, fmt):
+        return fmt in self.formats
+
+    def submit(self, fmt, func, *args, **kwargs):
+        # Queue func(*args, **kwargs) if `fmt` is enabled; returns whether it was queued
+        if not self.wants(fmt):
+            return False
+        self.tasks.append((func, args, kwargs))
+        return True
+
+    def run(self):
+        # Render everything queued so far and return the task results in submission order
+        tasks, self.tasks = self.tasks, []
+        if not tasks:
+            return []
+        if self.workers <= 1 or len(tasks) == 1:
+            use_agg()
+            return [func(*args, **kwargs) for func, args, kwargs in tasks]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), initializer=use_agg) as pool:
+            futures = [pool.submit(func, *args, **kwargs) for func, args, kwargs in tasks]
+            return [future.result() for future in futures]
+
+
+def add_render_arguments(parser, default_formats='png,html'):
+    parser.add_argument("--formats", type=parse_formats, default=parse_formats(default_formats),
+                        help=f"Comma-separated outputs to write ({', '.join(FORMATS)}); "
+                             f"default: {default_formats}")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes used to render figures (1 renders inline)")
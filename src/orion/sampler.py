@@ -0,0 +1,229 @@
+import argparse
+import glob
+import os
+import re
+import time
+from contextlib import ExitStack
+
+import numpy as np
+
+from orion import config
+from orion.coverage import point_weights
+from orion.interpolate import lookup
+
+# Local stand-in for earth_engine.js: average a year's monthly VIIRS rasters, sample seeded
+# random points in the export rectangle and write the same CSV Earth Engine sends to Drive.
+# Earth Engine's random generator cannot be reproduced, so points match per seed, not per pixel.
+
+raster_input_dir = os.path.join(config.data_dir, "viirs_monthly")
+
+# Monthly GeoTIFFs for a year, tried in order: data/viirs_monthly/<year>/*.tif, then *<year>*.tif.
+# Cloud-free coverage rasters sit next to them with cf_cvg in the file name.
+RASTER_PATTERNS = [os.path.join("{year}", "*.tif"), "*{year}*.tif"]
+COVERAGE_BAND = "cf_cvg"
+POINTS = 5000
+BLOCK_ROWS = 512  # Raster rows read per window; one window of every month is in memory at a time
+SOURCES = ['geotiff', 'grid']
+WRITE_CHUNK = 100000
+
+
+def monthly_rasters(year, directory=raster_input_dir, band='avg_rad'):
+    for pattern in RASTER_PATTERNS:
+        paths = [path for path in sorted(glob.glob(os.path.join(directory, pattern.format(year=year))))
+                 if (COVERAGE_BAND in os.path.basename(path)) == (band == COVERAGE_BAND)]
+        if paths:
+            return paths
+    raise FileNotFoundError(f"No {band} GeoTIFFs for {year} in {directory}")
+
+
+def coverage_rasters(year, paths, directory=raster_input_dir):
+    # The cf_cvg raster of every avg_rad raster in paths, matched by calendar month
+    found = monthly_rasters(year, directory, COVERAGE_BAND)
+    by_month = {month_of(path, year, i): path for i, path in enumerate(found)}
+    months = [month_of(path, year, i) for i, path in enumerate(paths)]
+    missing = [month for month in months if month not in by_month]
+    if missing:
+        raise FileNotFoundError(f"No {COVERAGE_BAND} GeoTIFFs for {year} months {missing} in {directory}")
+    return [by_month[month] for month in months]
+
+
+def random_points(n, seed, bounds=config.INDIA_BOUNDS):
+    # Uniform in the planar rectangle, like ee.FeatureCollection.randomPoints on Rectangle([68, 6, 97, 37])
+    south, west, north, east = bounds
+    rng = np.random.default_rng(seed)
+    lon = rng.uniform(west, east, n)
+    lat = rng.uniform(south, north, n)
+    return lat, lon
+
+
+def month_of(path, year, position):
+    # Calendar month from a file name such as VIIRS_2020_03.tif, 202003.tif or 20200301.tif,
+    # else its sorted position
+    match = re.search(rf"{year}[-_]?(\d{{2}})(?:[-_]?\d{{2}})?(?!\d)", os.path.basename(path))
+    return int(match.group(1)) if match else position + 1
+
+
+def monthly_at(paths, lat, lon, block_rows=BLOCK_ROWS):
+    # (points, rasters) values at each point, NaN where a month is masked. Every raster is read
+    # in full-width windows of block_rows rows and only windows holding points are read.
+    try:
+        import rasterio
+        from rasterio.windows import Window
+    except ImportError:
+        raise ImportError("Sampling GeoTIFFs needs rasterio (pip install rasterio)") from None
+
+    with ExitStack() as stack:
+        sources = [stack.enter_context(rasterio.open(path)) for path in paths]
+        first = sources[0]
+        for src in sources[1:]:
+            if src.shape != first.shape or src.transform != first.transform:
+                raise ValueError(f"{src.name} is not on the same grid as {first.name}")
+
+        # Nearest pixel for every point, like sampleRegions at the native scale
+        inverse = ~first.transform
+        col, row = inverse * (np.asarray(lon), np.asarray(lat))
+        row = np.floor(row).astype(np.int64)
+        col = np.floor(col).astype(np.int64)
+        height, width = first.shape
+        inside = (row >= 0) & (row < height) & (col >= 0) & (col < width)
+
+        values = np.full((len(row), len(sources)), np.nan, dtype=np.float32)
+        order = np.flatnonzero(inside)[np.argsort(row[inside], kind='stable')]
+        sorted_rows = row[order]
+        for start in range(0, height, block_rows):
+            lo, hi = np.searchsorted(sorted_rows, [start, start + block_rows])
+            if lo == hi:
+                continue
+            window = Window(0, start, width, min(block_rows, height - start))
+            points = order[lo:hi]
+            r = row[points] - start
+            c = col[points]
+            for month, src in enumerate(sources):
+                band = src.read(1, window=window, masked=True)
+                values[points, month] = band.astype(np.float32).filled(np.nan)[r, c]
+    return values
+
+
+def annual_mean_at(paths, lat, lon, block_rows=BLOCK_ROWS, coverage_paths=()):
+    # Mean of the unmasked months at each point, the stack's annual composite. With coverage
+    # rasters every month counts in proportion to its cloud-free observations, as in
+    # earth_engine.js, and the summed counts are returned too (else None).
+    values = monthly_at(list(paths) + list(coverage_paths), lat, lon, block_rows)
+    monthly = values[:, :len(paths)]
+    valid = ~np.isnan(monthly)
+    weights = valid.astype(np.float64)
+    coverage = None
+    if coverage_paths:
+        counts = values[:, len(paths):]
+        weights *= point_weights(counts)
+        coverage = np.nansum(np.where(valid, counts, np.nan), axis=1).astype(np.float32)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = ((np.where(valid, monthly, 0) * weights).sum(axis=1) / weights.sum(axis=1)).astype(np.float32)
+    return means, coverage
+
+
+def sample_year(year, n=POINTS, source='geotiff', directory=raster_input_dir, seed=None, coverage=False):
+    # (lat, lon, {band column: values}, point index) for the year's seeded points that landed on
+    # valid pixels; coverage adds the year's cf_cvg total and weights months by it
+    lat, lon = random_points(n, year if seed is None else seed)
+    counts = None
+    if source == 'geotiff':
+        paths = monthly_rasters(year, directory)
+        coverage_paths = coverage_rasters(year, paths, directory) if coverage else ()
+        values, counts = annual_mean_at(paths, lat, lon, coverage_paths=coverage_paths)
+    else:
+        # Interpolated surface of the existing exports; no rasters needed, for scale tests
+        values = lookup(year, lat, lon).astype(np.float32)
+    # sampleRegions drops points whose pixel is masked, keeping the original point numbers
+    keep = np.flatnonzero(~np.isnan(values))
+    columns = {'avg_rad': values[keep]}
+    if counts is not None:
+        columns[COVERAGE_BAND] = counts[keep]
+    return lat[keep], lon[keep], columns, keep
+
+
+def sample_year_monthly(year, n=POINTS, directory=raster_input_dir, seed=None, coverage=False):
+    # (lat, lon, {band column: values}, point index) with one avg_rad column per monthly raster,
+    # named like the bands of ImageCollection.toBands() (e.g. 20200301_avg_rad), and a matching
+    # 20200301_cf_cvg column per month with coverage
+    lat, lon = random_points(n, year if seed is None else seed)
+    paths = monthly_rasters(year, directory)
+    bands = {'avg_rad': paths}
+    if coverage:
+        bands[COVERAGE_BAND] = coverage_rasters(year, paths, directory)
+    values = monthly_at([path for band_paths in bands.values() for path in band_paths], lat, lon)
+    keep = np.flatnonzero(~np.isnan(values[:, :len(paths)]).all(axis=1))
+    months = [month_of(path, year, i) for i, path in enumerate(paths)]
+    columns = {f"{year}{month:02d}01_{band}": values[keep, b * len(paths) + i]
+               for b, band in enumerate(bands) for i, month in enumerate(months)}
+    return lat[keep], lon[keep], dict(sorted(columns.items())), keep
+
+
+def format_values(values):
+    # Shortest float32 text per value, blank where masked, as in Earth Engine's CSVs
+    values = np.asarray(values, dtype=np.float32)
+    return np.where(np.isnan(values), '', values.astype(str)).tolist()
+
+
+def write_export(path, lat, lon, columns, index, chunk=WRITE_CHUNK):
+    # Earth Engine's Drive CSV: system:index, the sampled bands and a GeoJSON point per row.
+    # Rows are formatted straight to text in chunks, byte-for-byte what pandas would write
+    # but without a DataFrame of strings.
+    if not isinstance(columns, dict):
+        columns = {'avg_rad': columns}
+    index, lon, lat = np.asarray(index), np.asarray(lon), np.asarray(lat)
+    with open(path, 'w', newline='') as f:
+        f.write(','.join(['system:index', *columns, '.geo']) + '\n')
+        for start in range(0, len(index), chunk):
+            block = slice(start, start + chunk)
+            values = zip(*[format_values(column[block]) for column in columns.values()])
+            f.write(''.join([
+                f'{i}_0,{",".join(row)},"{{""geodesic"":false,""type"":""Point"",""coordinates"":[{x!r},{y!r}]}}"\n'
+                for i, row, x, y in zip(index[block].tolist(), values, lon[block].tolist(), lat[block].tolist())
+            ]))
+
+
+def export_path(year, output_dir=config.sample_dir, monthly=False):
+    return os.path.join(output_dir, f"VIIRS_India_{'monthly_' if monthly else ''}{year}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample seeded random points from local VIIRS rasters "
+                                                 "into Earth Engine's CSV export format")
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS)
+    parser.add_argument("--points", type=int, default=POINTS, help="Random points per year")
+    parser.add_argument("--source", choices=SOURCES, default='geotiff',
+                        help="Monthly GeoTIFFs, or the interpolated grids of the existing exports")
+    parser.add_argument("--input-dir", default=raster_input_dir, help="Directory holding the monthly GeoTIFFs")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for every year (default: the year)")
+    parser.add_argument("--monthly", action="store_true",
+                        help="Keep one avg_rad column per month instead of the annual mean (GeoTIFFs only)")
+    parser.add_argument("--coverage", action="store_true",
+                        help="Also sample the cf_cvg GeoTIFFs: write cloud-free counts and weight months by them")
+    parser.add_argument("-o", "--output-dir", default=config.sample_dir)
+    args = parser.parse_args()
+    if args.monthly and args.source != 'geotiff':
+        parser.error("--monthly needs --source geotiff")
+    if args.coverage and args.source != 'geotiff':
+        parser.error("--coverage needs --source geotiff")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for year in args.years:
+        start = time.perf_counter()
+        if args.monthly:
+            lat, lon, columns, index = sample_year_monthly(year, args.points, args.input_dir, args.seed,
+                                                           args.coverage)
+        else:
+            lat, lon, columns, index = sample_year(year, args.points, args.source, args.input_dir, args.seed,
+                                                   args.coverage)
+        sampled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        path = export_path(year, args.output_dir, args.monthly)
+        write_export(path, lat, lon, columns, index)
+        print(f"{year}: {len(index)} of {args.points} points sampled in {sampled:.2f}s, "
+              f"written in {time.perf_counter() - start:.2f}s -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def to_unit_xyz(lat, lon):
+    # Points on the unit sphere, so straight-line (chord) distance is monotonic in great-circle distance
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_meters(chord):
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def meters_to_chord(meters):
+    return 2 * np.sin(np.asarray(meters, dtype=float) / (2 * EARTH_RADIUS_M))
+
+
+class PointIndex:
+    # KD-tree over lat/lon samples answering nearest-neighbour queries in meters
+
+    def __init__(self, lat, lon):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.xyz = to_unit_xyz(self.lat, self.lon)
+        self.tree = cKDTree(self.xyz)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def query(self, lat, lon, k=1, workers=1):
+        # Distances (meters) and indices of the k nearest samples for every query point;
+        # workers=-1 spreads large batches over every core
+        chord, idx = self.tree.query(to_unit_xyz(lat, lon), k=k, workers=workers)
+        return chord_to_meters(chord), idx
+
+    def query_radius(self, lat, lon, radius_m):
+        # Lists of sample indices within `radius_m` of every query point
+        return self.tree.query_ball_point(to_unit_xyz(lat, lon), meters_to_chord(radius_m))
@@ -0,0 +1,102 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from orion.config import YEARS, DARK_SKY_THRESHOLD, MAX_SAMPLE_DISTANCE_M
+from orion.coverage import WEIGHTINGS
+from orion.interpolate import METHODS, interpolate
+from orion.viirs import year_index, year_weights
+
+LAT_COLUMNS = ['latitude', 'lat', 'y']
+LON_COLUMNS = ['longitude', 'lon', 'lng', 'long', 'x']
+
+
+def find_column(df, candidates):
+    lookup = {column.lower(): column for column in df.columns}
+    for name in candidates:
+        if name in lookup:
+            return lookup[name]
+    raise ValueError(f"Could not find any of the columns {candidates} in the sites file")
+
+
+def read_sites(csv_file):
+    # Read candidate sites and return them with normalized latitude/longitude columns
+    sites = pd.read_csv(csv_file)
+    lat_column = find_column(sites, LAT_COLUMNS)
+    lon_column = find_column(sites, LON_COLUMNS)
+    sites = sites.rename(columns={lat_column: 'latitude', lon_column: 'longitude'})
+    return sites.dropna(subset=['latitude', 'longitude']).reset_index(drop=True)
+
+
+def score_year(lat, lon, year, threshold=DARK_SKY_THRESHOLD, method='nearest',
+               max_distance_m=MAX_SAMPLE_DISTANCE_M, weighting='equal'):
+    # Radiance, nearest-sample distance and suitability for every site in one vectorized query.
+    # Sites further than max_distance_m from every sample are unknown: NaN radiance, <NA> suitability.
+    # weighting only affects interpolated radiance; the nearest sample is used as is.
+    index, values = year_index(year)
+    distance, idx = index.query(lat, lon)
+    if method == 'nearest':
+        radiance = values[idx].astype(float)
+    else:
+        # Kriging weights can be negative and overshoot below zero; radiance cannot
+        radiance = np.maximum(interpolate(index, values, lat, lon, method=method,
+                                          sample_weights=year_weights(year, weighting)), 0)
+    known = distance <= max_distance_m
+    radiance = np.where(known, radiance, np.nan)
+    suitable = pd.array(radiance <= threshold, dtype='boolean')
+    suitable[~known] = pd.NA
+    return pd.DataFrame({
+        'year': year,
+        'avg_rad': radiance,
+        'distance_m': distance,
+        'suitable': suitable,
+    })
+
+
+def score_sites(sites, years=YEARS, threshold=DARK_SKY_THRESHOLD, method='nearest',
+                max_distance_m=MAX_SAMPLE_DISTANCE_M, weighting='equal'):
+    # Score every site against every year; one row per (site, year)
+    lat = sites['latitude'].to_numpy(dtype=float)
+    lon = sites['longitude'].to_numpy(dtype=float)
+
+    results = []
+    for year in years:
+        scores = score_year(lat, lon, year, threshold, method, max_distance_m, weighting)
+        scores.insert(0, 'site', np.arange(len(sites)))
+        results.append(scores)
+
+    results = pd.concat(results, ignore_index=True)
+    results = sites.reset_index(drop=True).join(results.set_index('site'), how='right')
+    return results.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score candidate observing sites for dark-sky suitability")
+    parser.add_argument("sites", help="CSV file with latitude/longitude columns")
+    parser.add_argument("-o", "--output", default="site_suitability.csv", help="Output CSV file")
+    parser.add_argument("--years", type=int, nargs="+", default=YEARS, help="Years to score against")
+    parser.add_argument("--threshold", type=float, default=DARK_SKY_THRESHOLD,
+                        help="Radiance above this is considered unsuitable")
+    parser.add_argument("--method", choices=['nearest'] + METHODS, default='nearest',
+                        help="Use the nearest sample or interpolate radiance between samples")
+    parser.add_argument("--max-distance-km", type=float, default=MAX_SAMPLE_DISTANCE_M / 1000,
+                        help="Sites further than this from every sample are scored as unknown")
+    parser.add_argument("--weights", choices=WEIGHTINGS, default='equal',
+                        help="Scale idw neighbours by their cloud-free observation count (cf_cvg)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sites = read_sites(args.sites)
+    results = score_sites(sites, args.years, args.threshold, args.method, args.max_distance_km * 1000,
+                          args.weights)
+    results.to_csv(args.output, index=False)
+
+    print(f"Scored {len(sites)} sites against {len(args.years)} years "
+          f"in {time.perf_counter() - start:.2f}s ({int(results['suitable'].isna().sum())} unknown)")
+    print(f"Results have been saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
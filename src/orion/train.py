@@ -0,0 +1,160 @@
+import argparse
+import time
+
+import numpy as np
+import xgboost as xgb
+
+from orion import config
+from orion.features import FEATURE_SETS, build_features, training_rows
+from orion.models import DEFAULT_MODEL, FORMATS, save_model
+from orion.viirs import load_panel
+
+# Same model as the notebook's XGBRegressor, expressed as native booster parameters
+PARAMS = {
+    'objective': 'reg:squarederror',
+    'eta': 0.05,
+    'max_depth': 7,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'tree_method': 'hist',
+    'max_bin': 256,
+    'seed': 42,
+}
+NUM_BOOST_ROUND = 500
+EARLY_STOPPING_ROUNDS = 50
+# The lagged features lose to persistence and to the basic model in `python -m orion.backtest`,
+# so they stay opt-in until they beat that baseline
+FEATURE_SET = 'basic'
+HORIZONS = [1, 2, 3]  # Years ahead each training row looks back, so multi-year forecasts are in-sample
+
+
+def feature_matrix(rows, features, clip=False):
+    # Model inputs for panel rows, with history read `horizon` years back when the set needs it
+    return build_features(rows['Latitude'].to_numpy(), rows['Longitude'].to_numpy(), rows['Year'].to_numpy(),
+                          rows['horizon'].to_numpy(), features, clip)
+
+
+def split_holdout(panel, holdout_year):
+    # Train on every other year and validate on one unseen year, like forecasting ahead
+    if holdout_year is None:
+        return panel, None
+    held = (panel['Year'] == holdout_year).to_numpy()
+    if not held.any():
+        raise ValueError(f"Holdout year {holdout_year} is not in the training data")
+    return panel[~held], panel[held]
+
+
+def errors(booster, dmatrix, labels, iteration_range=(0, 0)):
+    error = booster.predict(dmatrix, iteration_range=iteration_range) - labels
+    return {'mae': float(np.mean(np.abs(error))), 'rmse': float(np.sqrt(np.mean(error ** 2)))}
+
+
+def train(years=config.YEARS, holdout_year=None, params=None, num_boost_round=NUM_BOOST_ROUND,
+          early_stopping_rounds=EARLY_STOPPING_ROUNDS, clip=False, refit=True, log=print,
+          feature_set=FEATURE_SET, horizons=HORIZONS):
+    # Fit a booster on the cached VIIRS panel; returns (booster, metrics, timings)
+    params = dict(PARAMS, **(params or {}))
+    features = FEATURE_SETS[feature_set]
+    timings = {}
+
+    start = time.perf_counter()
+    panel = load_panel(years, clip)
+    panel = panel[~np.isnan(panel['avg_rad'].to_numpy())]
+    if 'horizon' in features:
+        panel = training_rows(panel, horizons)
+    else:
+        panel = panel.assign(horizon=1)
+    train_rows, holdout_rows = split_holdout(panel, holdout_year)
+    timings['load'] = time.perf_counter() - start
+    log(f"Loaded {len(panel)} rows ({len(train_rows)} train) in {timings['load']:.2f}s")
+
+    start = time.perf_counter()
+    X = feature_matrix(panel, features, clip)
+    labels = panel['avg_rad'].to_numpy()
+    held = (panel['Year'] == holdout_year).to_numpy()
+    timings['features'] = time.perf_counter() - start
+    log(f"Built {len(features)} features for {len(X)} rows in {timings['features']:.2f}s")
+
+    start = time.perf_counter()
+    # QuantileDMatrix bins the features once for the hist method instead of keeping a float copy
+    dtrain = xgb.QuantileDMatrix(X[~held], labels[~held], feature_names=features, max_bin=params['max_bin'])
+    evals = [(dtrain, 'train')]
+    if holdout_rows is not None:
+        dholdout = xgb.QuantileDMatrix(X[held], labels[held], feature_names=features, ref=dtrain)
+        evals.append((dholdout, f'holdout_{holdout_year}'))
+    timings['matrix'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    booster = xgb.train(params, dtrain, num_boost_round, evals=evals,
+                        early_stopping_rounds=early_stopping_rounds if holdout_rows is not None else None,
+                        verbose_eval=False)
+    timings['fit'] = time.perf_counter() - start
+
+    metrics = {'train_samples': int(len(train_rows))}
+    if holdout_rows is not None:
+        best = booster.best_iteration + 1
+        holdout_error = errors(booster, dholdout, labels[held], (0, best))
+        metrics.update({'holdout_year': int(holdout_year), 'holdout_samples': int(len(holdout_rows)),
+                        'best_iteration': int(best), **{f'holdout_{k}': v for k, v in holdout_error.items()}})
+        log(f"Early stopping kept {best} of {num_boost_round} rounds; holdout {holdout_year} "
+            f"MAE {holdout_error['mae']:.3f}, RMSE {holdout_error['rmse']:.3f} ({timings['fit']:.2f}s)")
+
+        if refit:
+            # Retrain on every year, holdout included, for the number of rounds that validated best
+            start = time.perf_counter()
+            dtrain = xgb.QuantileDMatrix(X, labels, feature_names=features, max_bin=params['max_bin'])
+            booster = xgb.train(params, dtrain, best)
+            metrics['train_samples'] = int(len(panel))
+            timings['refit'] = time.perf_counter() - start
+            log(f"Refit on all {len(years)} years in {timings['refit']:.2f}s")
+    else:
+        log(f"Fit {num_boost_round} rounds in {timings['fit']:.2f}s")
+
+    metrics.update({f'train_{k}': v for k, v in errors(booster, dtrain, dtrain.get_label()).items()})
+    return booster, metrics, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the radiance model from the cached VIIRS data")
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS, help="Years to train on")
+    parser.add_argument("--holdout-year", type=int, default=None,
+                        help="Year held out for early stopping (default: the latest of --years)")
+    parser.add_argument("--no-holdout", action="store_true", help="Train on every year for a fixed number of rounds")
+    parser.add_argument("--no-refit", action="store_true",
+                        help="Keep the early-stopped model instead of refitting on all years")
+    parser.add_argument("--rounds", type=int, default=NUM_BOOST_ROUND, help="Maximum boosting rounds")
+    parser.add_argument("--early-stopping", type=int, default=EARLY_STOPPING_ROUNDS,
+                        help="Stop after this many rounds without holdout improvement")
+    parser.add_argument("--features", choices=sorted(FEATURE_SETS), default=FEATURE_SET,
+                        help="Coordinates only, or coordinates plus lagged neighbourhood radiance")
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS,
+                        help="Forecast horizons (years) to build training rows for")
+    parser.add_argument("--clip", action="store_true", help="Only train on samples inside the India boundary")
+    parser.add_argument("--seed", type=int, default=PARAMS['seed'])
+    parser.add_argument("--name", default=DEFAULT_MODEL, help="Registry name to save the model under")
+    parser.add_argument("--format", choices=FORMATS, default='ubj')
+    args = parser.parse_args()
+
+    holdout_year = None if args.no_holdout else (args.holdout_year or max(args.years))
+    params = {'seed': args.seed}
+    booster, metrics, timings = train(args.years, holdout_year, params, args.rounds, args.early_stopping,
+                                      args.clip, refit=not args.no_refit, feature_set=args.features,
+                                      horizons=args.horizons)
+    horizons = args.horizons if 'horizon' in FEATURE_SETS[args.features] else None
+    if horizons:
+        metrics['horizons'] = horizons
+
+    start = time.perf_counter()
+    save_model(booster, args.name, FEATURE_SETS[args.features], args.years, metrics, dict(PARAMS, **params),
+               args.format, source="orion.train", clip=args.clip, horizons=horizons)
+    timings['save'] = time.perf_counter() - start
+
+    print("\nStage timings:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<8}{seconds:.2f}s")
+    print(f"Metrics: {metrics}")
+    print(f"Model '{args.name}' saved to the registry")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from orion import config
+from orion.interpolate import cached_grid
+from orion.viirs import inside_boundary
+
+# Per-cell forecasts from each grid cell's own 2014-2023 history. Every model runs on a
+# (cells, years) matrix with the time loop outermost, so a million cells is a handful of
+# array operations per year rather than a million model fits.
+
+FUTURE_YEARS = [2024, 2025, 2026, 2027, 2028, 2029]
+DEFAULT_METHOD = 'damped'
+# Holt smoothing weights searched per cell; each cell keeps the pair with the lowest one-step error
+ALPHAS = np.array([0.2, 0.5, 0.8])
+BETAS = np.array([0.1, 0.3])
+DAMPING = 0.9
+# Uncertainty bands written next to the point forecast
+QUANTILES = [0.1, 0.5, 0.9]
+BOOTSTRAP_PATHS = 200
+# Upper bound on elements in a (cells, paths, years) bootstrap block
+BLOCK_ELEMENTS = 2 ** 24
+
+
+def cell_history(years=config.YEARS, resolution=0.05, method='idw', clip=True):
+    # Cell-center coordinates and a (cells, years) radiance matrix from the cached yearly grids
+    spec = None
+    columns = []
+    for year in years:
+        spec, grid = cached_grid(year, method, resolution)
+        columns.append(np.asarray(grid, dtype=np.float32).ravel())
+    lat, lon = spec.centers()
+    grid_lon, grid_lat = np.meshgrid(lon, lat)
+    lat, lon = grid_lat.ravel(), grid_lon.ravel()
+    history = np.column_stack(columns)
+    if clip:
+        inside = inside_boundary(lat, lon)
+        lat, lon, history = lat[inside], lon[inside], history[inside]
+    return lat, lon, history
+
+
+def smooth(y, alpha, beta, phi):
+    # One Holt recursion down the year axis of y; alpha and beta broadcast against the cells.
+    # Returns the final level and trend and the one-step errors of every year after the first.
+    level = np.broadcast_to(y[0], np.broadcast_shapes(alpha.shape, y[0].shape)).copy()
+    trend = np.broadcast_to(y[1] - y[0], level.shape).copy()
+    errors = []
+    for observed in y[1:]:
+        expected = level + phi * trend
+        # A missing year leaves the state on its forecast path
+        observed = np.where(np.isnan(observed), expected, observed)
+        errors.append(observed - expected)
+        new_level = alpha * observed + (1 - alpha) * expected
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+    return level, trend, np.stack(errors)
+
+
+class LinearTrend:
+    # Least-squares line through every row at once
+
+    def __init__(self, history, years):
+        t = np.asarray(years, dtype=np.float32)
+        self.center = t.mean()
+        t = t - self.center
+        self.mean = history.mean(axis=1)
+        self.slope = (history - self.mean[:, None]) @ t / (t @ t)
+        self.residuals = history - (self.mean[:, None] + self.slope[:, None] * t[None, :])
+
+    def forecast(self, targets):
+        ahead = np.asarray(targets, dtype=np.float32) - self.center
+        return self.mean[:, None] + self.slope[:, None] * ahead[None, :]
+
+    def horizon(self, targets):
+        return len(targets)
+
+    def paths(self, rows, targets, errors):
+        # Independent residual draws around the line: (rows, targets, paths)
+        return self.forecast(targets)[rows, :, None] + errors[:, :len(targets)]
+
+
+class HoltTrend:
+    # Holt's linear (phi=1) or damped-trend (phi<1) smoothing for every row, with a small
+    # (alpha, beta) grid evaluated in one pass and the best pair kept per row
+
+    def __init__(self, history, years, phi=1.0):
+        self.phi = phi
+        self.last_year = years[-1]
+        alpha, beta = (a.ravel()[:, None].astype(np.float32) for a in np.meshgrid(ALPHAS, BETAS))
+        # (years, 1, cells) against (params, 1) searches every pair at once
+        _, _, errors = smooth(history.T[:, None, :], alpha, beta, phi)
+        best = np.argmin((errors ** 2).sum(axis=0), axis=0)
+        self.alpha = alpha[best, 0]
+        self.beta = beta[best, 0]
+        self.level, self.trend, errors = smooth(history.T, self.alpha, self.beta, phi)
+        self.residuals = errors.T
+
+    def steps(self, targets):
+        # Years ahead of the last observed one; the recursion only runs forwards
+        steps = np.asarray(targets) - self.last_year
+        if (steps < 1).any():
+            raise ValueError(f"Target years must come after the last history year {self.last_year}")
+        return steps
+
+    def horizon(self, targets):
+        return int(self.steps(targets).max())
+
+    def forecast(self, targets):
+        # Sum of phi^1..phi^h: how much of the trend survives h steps of damping
+        damping = np.array([np.sum(self.phi ** np.arange(1, h + 1)) for h in self.steps(targets)],
+                           dtype=np.float32)
+        return self.level[:, None] + self.trend[:, None] * damping[None, :]
+
+    def paths(self, rows, targets, errors):
+        # Run the recursion forward with resampled one-step errors: (rows, targets, paths)
+        steps = self.steps(targets)
+        level = self.level[rows, None]
+        trend = self.trend[rows, None]
+        alpha = self.alpha[rows, None]
+        beta = self.beta[rows, None]
+        values = []
+        for error in errors.transpose(1, 0, 2):
+            expected = level + self.phi * trend
+            values.append(expected + error)
+            level = expected + alpha * error
+            trend = self.phi * trend + alpha * beta * error
+        return np.stack([values[h - 1] for h in steps], axis=1)
+
+
+METHODS = {
+    'linear': LinearTrend,
+    'holt': HoltTrend,
+    'damped': lambda history, years: HoltTrend(history, years, phi=DAMPING),
+}
+
+
+def fit_cells(history, years, method=DEFAULT_METHOD):
+    return METHODS[method](np.asarray(history, dtype=np.float32), list(years))
+
+
+def forecast_cells(history, years, targets=FUTURE_YEARS, method=DEFAULT_METHOD):
+    # (cells, targets) radiance forecasts; radiance cannot go negative
+    return np.maximum(fit_cells(history, years, method).forecast(list(targets)), 0)
+
+
+def forecast_quantiles(model, targets=FUTURE_YEARS, quantiles=QUANTILES, n_paths=BOOTSTRAP_PATHS, seed=0):
+    # {quantile: (cells, targets)} from a residual bootstrap. Each cell resamples its own
+    # in-sample errors; the draw positions are shared, so every block of cells is one
+    # fancy-index and one forward pass, kept under BLOCK_ELEMENTS.
+    targets = list(targets)
+    # Centred per cell, so the bands spread around the point forecast instead of carrying
+    # the in-sample bias forward as drift
+    residuals = model.residuals - np.nanmean(model.residuals, axis=1, keepdims=True)
+    horizon = model.horizon(targets)
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, residuals.shape[1], size=(horizon, n_paths))
+
+    # Linear interpolation between order statistics, as np.quantile does, read off one sort
+    position = np.asarray(quantiles) * (n_paths - 1)
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, n_paths - 1)
+    fraction = (position - lower).astype(np.float32)
+
+    n_cells = len(residuals)
+    result = {q: np.empty((n_cells, len(targets)), dtype=np.float32) for q in quantiles}
+    chunk = max(1, BLOCK_ELEMENTS // (n_paths * horizon))
+    for start in range(0, n_cells, chunk):
+        rows = np.arange(start, min(start + chunk, n_cells))
+        errors = np.nan_to_num(residuals[rows][:, idx])
+        paths = np.sort(np.maximum(model.paths(rows, targets, errors), 0), axis=-1)
+        for i, q in enumerate(quantiles):
+            result[q][rows] = paths[..., lower[i]] + fraction[i] * (paths[..., upper[i]] - paths[..., lower[i]])
+    return result
+
+
+def quantile_column(q):
+    return f"predicted_p{int(round(q * 100))}"
+
+
+def predictions_frame(lat, lon, targets, predicted, bands=None):
+    # Long format read by the predicted-year heatmap scripts, one block of rows per year
+    n = len(lat)
+    frame = pd.DataFrame({
+        'latitude': np.tile(lat, len(targets)),
+        'longitude': np.tile(lon, len(targets)),
+        'year': np.repeat(targets, n),
+        'predicted_light_pollution': predicted.T.ravel(),
+    })
+    for q, values in (bands or {}).items():
+        frame[quantile_column(q)] = values.T.ravel()
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast every grid cell from its own radiance history "
+                                                 "and write the predicted-heatmap input")
+    parser.add_argument("--method", choices=list(METHODS), default=DEFAULT_METHOD)
+    parser.add_argument("--target-years", type=int, nargs="+", default=FUTURE_YEARS)
+    parser.add_argument("--years", type=int, nargs="+", default=config.YEARS, help="History to fit")
+    parser.add_argument("--resolution", type=float, default=0.05, help="Cell size in degrees")
+    parser.add_argument("--no-clip", action="store_true", help="Keep cells outside the India boundary")
+    parser.add_argument("--quantiles", type=float, nargs="*", default=QUANTILES,
+                        help="Bootstrap quantiles to add as predicted_pNN columns (none to skip)")
+    parser.add_argument("--paths", type=int, default=BOOTSTRAP_PATHS, help="Bootstrap paths per cell")
+    parser.add_argument("-o", "--output", default=config.predictions_file)
+    args = parser.parse_args()
+    if min(args.target_years) <= max(args.years):
+        parser.error(f"--target-years must come after the last history year {max(args.years)}")
+
+    timings = {}
+    start = time.perf_counter()
+    lat, lon, history = cell_history(args.years, args.resolution, clip=not args.no_clip)
+    timings['history'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = fit_cells(history, args.years, args.method)
+    predicted = np.maximum(model.forecast(args.target_years), 0)
+    timings['forecast'] = time.perf_counter() - start
+
+    bands = None
+    if args.quantiles:
+        start = time.perf_counter()
+        bands = forecast_quantiles(model, args.target_years, args.quantiles, args.paths)
+        timings['quantiles'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frame = predictions_frame(lat, lon, args.target_years, predicted, bands)
+    frame.to_csv(args.output, index=False, float_format='%.5f')
+    timings['write'] = time.perf_counter() - start
+
+    print(f"{len(lat)} cells x {len(args.target_years)} years ({args.method}):")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<10}{seconds:.2f}s")
+    print(frame.drop(columns=['latitude', 'longitude']).groupby('year').mean().to_string(float_format='%.3f'))
+    print(f"Predictions have been saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
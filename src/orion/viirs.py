@@ -0,0 +1,148 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from orion import catalog, config
+from orion.coverage import point_weights
+from orion.spatial import PointIndex
+
+# Matches the lon/lat pair inside the `.geo` GeoJSON strings exported by Earth Engine
+COORDS_PATTERN = r'"coordinates"\s*:\s*\[\s*([-+0-9.eE]+)\s*,\s*([-+0-9.eE]+)\s*\]'
+
+
+def viirs_path(year):
+    return catalog.resolve('viirs', year)
+
+
+def available_years(years=config.YEARS):
+    return [year for year in years if catalog.candidates('viirs', year)]
+
+
+def columns_path(year):
+    # Keyed by file content, so duplicate exports of a year share one cache
+    return catalog.cache_path(viirs_path(year), "viirs", ".npz")
+
+
+def extract_coords(geo):
+    # Parse every `.geo` string in one vectorized pass instead of json.loads per row
+    coords = geo.str.extract(COORDS_PATTERN)
+    lon = pd.to_numeric(coords[0], errors='coerce').to_numpy()
+    lat = pd.to_numeric(coords[1], errors='coerce').to_numpy()
+    return lat, lon
+
+
+@lru_cache(maxsize=None)
+def load_boundary():
+    india = gpd.read_file(catalog.resolve('boundary'))
+    boundary = shapely.union_all(india.geometry.values)
+    shapely.prepare(boundary)
+    return boundary
+
+
+def inside_boundary(lat, lon):
+    return shapely.contains_xy(load_boundary(), lon, lat)
+
+
+def build_columns(year):
+    # Parse one year's CSV once into plain arrays plus its boundary mask, and cache them.
+    # cf_cvg (cloud-free observation counts) is optional; older exports get NaN counts.
+    df = pd.read_csv(viirs_path(year), usecols=lambda name: name in ('avg_rad', 'cf_cvg', '.geo'),
+                     dtype={'avg_rad': np.float64, 'cf_cvg': np.float64})
+    lat, lon = extract_coords(df['.geo'])
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    inside = np.zeros(len(df), dtype=bool)
+    inside[valid] = inside_boundary(lat[valid], lon[valid])
+
+    columns = {
+        'lat': lat,
+        'lon': lon,
+        'avg_rad': df['avg_rad'].to_numpy(),
+        'cf_cvg': df['cf_cvg'].to_numpy() if 'cf_cvg' in df else np.full(len(df), np.nan),
+        'inside': inside,
+    }
+    path = columns_path(year)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **columns)
+    return columns
+
+
+def load_columns(year, names=('lat', 'lon', 'avg_rad', 'inside')):
+    # Requested arrays for one year from the columnar cache; a changed CSV hashes to a new cache file.
+    # Members of the uncompressed .npz are read individually, so asking for fewer columns reads less.
+    path = columns_path(year)
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            # Caches written before a column was ingested are rebuilt
+            if all(name in cached.files for name in names):
+                return {name: cached[name] for name in names}
+    columns = build_columns(year)
+    return {name: columns[name] for name in names}
+
+
+def load_year(year, clip=True, coverage=False):
+    # Load one year of VIIRS samples as plain Latitude/Longitude/avg_rad columns,
+    # plus the cf_cvg counts when coverage is asked for
+    names = ('lat', 'lon', 'avg_rad', 'inside') + (('cf_cvg',) if coverage else ())
+    columns = load_columns(year, names)
+    keep = columns['inside'] if clip else ~(np.isnan(columns['lat']) | np.isnan(columns['lon']))
+
+    points = pd.DataFrame({
+        'Latitude': columns['lat'][keep],
+        'Longitude': columns['lon'][keep],
+        'avg_rad': columns['avg_rad'][keep],
+    })
+    if coverage:
+        points['cf_cvg'] = columns['cf_cvg'][keep]
+    return points
+
+
+def radiance(year, clip=True, dtype=np.float32):
+    # Just the radiance values (inside the boundary by default), without coordinates
+    columns = load_columns(year, ('avg_rad', 'inside'))
+    values = columns['avg_rad'].astype(dtype)
+    return values[columns['inside']] if clip else values
+
+
+def mean_radiance(years=config.YEARS, clip=True, weighting='equal'):
+    # Mean radiance per year, accumulated in float64; 'coverage' weights samples by cf_cvg
+    means = []
+    for year in years:
+        if weighting == 'equal':
+            means.append(float(np.mean(radiance(year, clip), dtype=np.float64)))
+            continue
+        columns = load_columns(year, ('avg_rad', 'cf_cvg', 'inside'))
+        keep = columns['inside'] if clip else slice(None)
+        means.append(float(np.average(columns['avg_rad'][keep],
+                                      weights=point_weights(columns['cf_cvg'][keep], weighting))))
+    return pd.DataFrame({'Year': list(years), 'Mean_Radiance': means})
+
+
+@lru_cache(maxsize=None)
+def year_index(year, clip=True):
+    # Spatial index and radiance values for one year's samples (clipped to the boundary by default)
+    points = load_year(year, clip)
+    index = PointIndex(points['Latitude'].to_numpy(), points['Longitude'].to_numpy())
+    return index, points['avg_rad'].to_numpy()
+
+
+def year_weights(year, weighting, clip=True):
+    # Per-sample weights aligned with year_index's values; None for equal weighting
+    if weighting == 'equal':
+        return None
+    columns = load_columns(year, ('lat', 'lon', 'cf_cvg', 'inside'))
+    keep = columns['inside'] if clip else ~(np.isnan(columns['lat']) | np.isnan(columns['lon']))
+    return point_weights(columns['cf_cvg'][keep], weighting)
+
+
+def load_panel(years=config.YEARS, clip=True, coverage=False):
+    # All requested years stacked into one long (point, year) frame
+    frames = []
+    for year in years:
+        points = load_year(year, clip, coverage)
+        points.insert(0, 'Year', year)
+        frames.append(points)
+    return pd.concat(frames, ignore_index=True)
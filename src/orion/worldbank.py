@@ -0,0 +1,126 @@
+import argparse
+import glob
+import os
+import pickle
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from orion import config
+
+POPULATION_GROWTH = 'SP.POP.GROW'  # Population growth (annual %)
+
+store_path = os.path.join(config.cache_dir, "worldbank.pkl")
+
+
+def indicator_files(directory=config.worldbank_dir):
+    # Wide World Bank exports as downloaded, e.g. API_SP.POP.GROW_DS2_en_csv_v2_13638.csv
+    return sorted(glob.glob(os.path.join(directory, "API_*.csv")))
+
+
+def source_stamps(files):
+    return [(os.path.basename(f), os.path.getsize(f), os.stat(f).st_mtime_ns) for f in files]
+
+
+def read_indicator_csv(path):
+    # One wide CSV (a row per country, a column per year) as long (country, indicator, year) rows
+    df = pd.read_csv(path, skiprows=4)
+    year_columns = [c for c in df.columns if c.isdigit()]
+    long = df.melt(id_vars=['Country Name', 'Country Code', 'Indicator Name', 'Indicator Code'],
+                   value_vars=year_columns, var_name='Year', value_name='Value')
+    long = long.dropna(subset=['Value'])
+    long['Year'] = long['Year'].astype(np.int16)
+    return long
+
+
+class WorldBankStore:
+    # Long-format indicator values indexed by (country code, indicator code, year).
+    # Lookups go through the MultiIndex hash table, so any country/year slice is O(1) per key.
+
+    def __init__(self, values, countries, indicators, sources=()):
+        self.values = values
+        self.countries = countries
+        self.indicators = indicators
+        self.sources = list(sources)
+        self.codes_by_name = pd.Series(countries.index, index=countries.to_numpy())
+
+    @classmethod
+    def from_files(cls, files):
+        long = pd.concat([read_indicator_csv(f) for f in files], ignore_index=True)
+        values = long.set_index(['Country Code', 'Indicator Code', 'Year'])['Value'].astype(np.float64)
+        values = values[~values.index.duplicated(keep='last')].sort_index()
+        countries = long.drop_duplicates('Country Code').set_index('Country Code')['Country Name']
+        indicators = long.drop_duplicates('Indicator Code').set_index('Indicator Code')['Indicator Name']
+        return cls(values, countries.sort_index(), indicators.sort_index(), source_stamps(files))
+
+    def country_code(self, country):
+        # Accept either an ISO3 code ("IND") or a World Bank country name ("India")
+        if country in self.countries.index:
+            return country
+        return self.codes_by_name[country]
+
+    def value(self, country, indicator, year):
+        return self.values.get((self.country_code(country), indicator, int(year)), np.nan)
+
+    def series(self, country, indicator, years=None):
+        # Indicator values for one country by year; missing years come back as NaN
+        keys = pd.MultiIndex.from_product([[self.country_code(country)], [indicator],
+                                           years if years is not None else self.years()])
+        series = self.values.reindex(keys)
+        series.index = keys.get_level_values(2)
+        series.index.name = 'Year'
+        return series
+
+    def panel(self, indicator, countries=None, years=None):
+        # Wide country x year table for one indicator
+        table = self.values.xs(indicator, level='Indicator Code').unstack('Year')
+        if countries is not None:
+            table = table.reindex([self.country_code(c) for c in countries])
+        if years is not None:
+            table = table.reindex(columns=years)
+        return table
+
+    def years(self):
+        return sorted(self.values.index.get_level_values('Year').unique())
+
+
+def build_store(directory=config.worldbank_dir):
+    # Convert every export in the folder and cache the indexed store
+    store = WorldBankStore.from_files(indicator_files(directory))
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    # Pickle the plain pandas parts so the cache does not depend on where the class is imported from
+    state = {'values': store.values, 'countries': store.countries,
+             'indicators': store.indicators, 'sources': store.sources}
+    with open(store_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return store
+
+
+@lru_cache(maxsize=None)
+def load_store(directory=config.worldbank_dir):
+    # Cached store, rebuilt when CSVs are added, removed or changed
+    if os.path.exists(store_path):
+        with open(store_path, 'rb') as f:
+            state = pickle.load(f)
+        if state['sources'] == source_stamps(indicator_files(directory)):
+            return WorldBankStore(**state)
+    return build_store(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert World Bank indicator CSVs into the indexed store")
+    parser.add_argument("--dir", default=config.worldbank_dir, help="Folder holding API_*.csv exports")
+    args = parser.parse_args()
+
+    store = build_store(args.dir)
+    years = store.years()
+    print(f"{len(store.values)} values for {len(store.countries)} countries and "
+          f"{len(store.indicators)} indicators ({years[0]}-{years[-1]})")
+    for code, name in store.indicators.items():
+        print(f"  {code}: {name}")
+    print(f"Store has been saved to {store_path}")
+
+
+if __name__ == "__main__":
+    main()
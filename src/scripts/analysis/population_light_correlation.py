@@ -3,48 +3,39 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px
+import argparse
 import os
+import sys
 
-def load_population_data(csv_file):
-    # Read the CSV file, skipping the first 4 rows
-    df = pd.read_csv(csv_file, skiprows=4)
-    
-    # Extract India's data
-    india_data = df[df['Country Name'] == 'India'].iloc[0]
-    
-    # Get years from 2014 to 2023
-    years = [str(year) for year in range(2014, 2024)]
-    growth_rates = [float(india_data[str(year)]) for year in range(2014, 2024)]
+# Get the project root directory
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_root)
+
+from orion import config
+from orion.correlation import correlation_table
+from orion.export import submit_plotly, write_dashboard
+from orion.figures import correlation_figures
+from orion.render import RenderScheduler, add_render_arguments
+from orion.viirs import mean_radiance
+from orion.worldbank import POPULATION_GROWTH, load_store
+
+def load_population_data(country='IND', years=range(2014, 2024)):
+    # Annual population growth (%) from the indexed World Bank store
+    growth = load_store().series(country, POPULATION_GROWTH, list(years))
     
     # Create a DataFrame with years and growth rates
     population_df = pd.DataFrame({
-        'Year': years,
-        'Growth_Rate': growth_rates
+        'Year': growth.index.astype(str),
+        'Growth_Rate': growth.to_numpy()
     })
     
     return population_df
 
-def load_light_pollution_data(base_path):
-    # List to store data for each year
-    data_list = []
-    
-    # Process each year from 2014 to 2023
-    for year in range(2014, 2024):
-        file_pattern = f"VIIRS_India_{year}.csv"
-        file_path = os.path.join(base_path, file_pattern)
-        
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path)
-            mean_radiance = df['avg_rad'].mean()
-            data_list.append({
-                'Year': str(year),
-                'Mean_Radiance': mean_radiance
-            })
-    
-    return pd.DataFrame(data_list)
+def load_light_pollution_data(years=range(2014, 2024)):
+    # Mean radiance of the samples inside India, from the shared columnar cache
+    light_df = mean_radiance(list(years))
+    light_df['Year'] = light_df['Year'].astype(str)
+    return light_df
 
 def analyze_correlation(population_df, light_df):
     # Merge the dataframes
@@ -55,46 +46,29 @@ def analyze_correlation(population_df, light_df):
     
     return merged_df, correlation
 
-def create_visualizations(merged_df, correlation, output_dir):
+def print_correlation_details(merged_df, lags=(-2, -1, 1, 2)):
+    # Rank correlations, a bootstrap interval and lagged correlations for the same series
+    table = correlation_table(merged_df['Growth_Rate'], merged_df['Mean_Radiance'], ['National'],
+                              merged_df['Year'].astype(int), lags=(0,) + tuple(lags))
+    row = table.iloc[0]
+    print("\nCorrelation Details:")
+    print("------------------")
+    print(f"Spearman: {row['Spearman']:.3f}, Kendall: {row['Kendall']:.3f}")
+    print(f"Pearson 95% bootstrap CI: [{row['CI_Low']:.3f}, {row['CI_High']:.3f}]")
+    for lag in lags:
+        print(f"Radiance lagged {lag:+d} year(s): {row[f'Lag_{lag:+d}']:.3f}")
+
+def create_visualizations(merged_df, correlation, output_dir, scheduler):
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    # Create a subplot with two y-axes
-    fig = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    # Add population growth rate line
-    fig.add_trace(
-        go.Scatter(x=merged_df['Year'], y=merged_df['Growth_Rate'],
-                  name="Population Growth Rate (%)", line=dict(color="blue")),
-        secondary_y=False
-    )
-    
-    # Add mean radiance line
-    fig.add_trace(
-        go.Scatter(x=merged_df['Year'], y=merged_df['Mean_Radiance'],
-                  name="Mean Radiance", line=dict(color="red")),
-        secondary_y=True
-    )
-    
-    # Update layout
-    fig.update_layout(
-        title=f"Population Growth Rate vs Light Pollution (Correlation: {correlation:.3f})",
-        xaxis_title="Year",
-        hovermode="x unified"
-    )
-    
-    # Update y-axes labels
-    fig.update_yaxes(title_text="Population Growth Rate (%)", secondary_y=False)
-    fig.update_yaxes(title_text="Mean Radiance", secondary_y=True)
-    
-    # Save the plot
-    fig.write_html(os.path.join(output_dir, "population_light_correlation.html"))
-    
-    # Create a scatter plot
-    scatter_fig = px.scatter(merged_df, x='Growth_Rate', y='Mean_Radiance',
-                           trendline="ols",
-                           title=f"Population Growth Rate vs Mean Radiance (Correlation: {correlation:.3f})")
-    scatter_fig.write_html(os.path.join(output_dir, "correlation_scatter.html"))
+    # Twin-axis time series and scatter, shared with orion.analyze
+    fig, scatter_fig = correlation_figures(merged_df, correlation)
+    submit_plotly(scheduler, fig, os.path.join(output_dir, "population_light_correlation.html"))
+    submit_plotly(scheduler, scatter_fig, os.path.join(output_dir, "correlation_scatter.html"))
+    scheduler.run()
+    if scheduler.wants('json'):
+        write_dashboard(output_dir)
     
     # Print summary statistics
     print("\nSummary Statistics:")
@@ -106,21 +80,25 @@ def create_visualizations(merged_df, correlation, output_dir):
     print(merged_df.to_string(index=False))
 
 def main():
-    # Set paths
-    base_path = "src/data/viirs"
-    population_file = "src/data/population/API_SP.POP.GROW_DS2_en_csv_v2_13638.csv"
-    output_dir = "docs/visualizations/analysis"
+    parser = argparse.ArgumentParser(description="Correlate population growth with mean radiance")
+    add_render_arguments(parser, default_formats='html,json')
+    args = parser.parse_args()
+    scheduler = RenderScheduler(args.formats, args.workers)
+
+    # Set paths relative to the project, independent of the working directory
+    output_dir = config.analysis_dir
     
     try:
         # Load data
-        population_df = load_population_data(population_file)
-        light_df = load_light_pollution_data(base_path)
+        population_df = load_population_data()
+        light_df = load_light_pollution_data()
         
         # Analyze correlation
         merged_df, correlation = analyze_correlation(population_df, light_df)
         
         # Create visualizations
-        create_visualizations(merged_df, correlation, output_dir)
+        create_visualizations(merged_df, correlation, output_dir, scheduler)
+        print_correlation_details(merged_df)
         
         print(f"Analysis completed successfully.")
         print(f"Results have been saved to {output_dir}/")
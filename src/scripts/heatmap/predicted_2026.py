@@ -1,18 +1,34 @@
 import pandas as pd
+import numpy as np
 import geopandas as gpd
 from shapely.geometry import Point
 import folium
 from folium.plugins import HeatMap, Geocoder
 import os
+import sys
 
-# Get the project root directory
-project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# Get the project root directory (three levels up from this script)
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(script_dir)))
+sys.path.insert(0, os.path.join(project_root, "src"))
+
+from orion.aggregate import GridLevel, cell_size
 
 # Set paths
 data_file = os.path.join(project_root, "src", "future_predictions.csv")
 boundary_file = os.path.join(project_root, "src", "data", "boundaries", "india_boundary.geojson")
 output_file = os.path.join(project_root, "docs", "visualizations", "heatmaps", "viirs_predicted_heatmap_2026.html")
 
+# Quantile columns written by `python -m orion.trends`, one selectable layer each
+QUANTILE_LAYERS = [
+    ('predicted_p10', 'P10 (optimistic)'),
+    ('predicted_p50', 'P50 (median)'),
+    ('predicted_p90', 'P90 (pessimistic)'),
+]
+# The heatmap stops refining at this zoom; forecast cells are averaged into cells of about
+# 8 screen pixels there, which look the same and keep every layer's embedded data small
+HEAT_MAX_ZOOM = 6
+
 # ----------------------------------------
 # Load the predicted light pollution data
 # ----------------------------------------
@@ -42,19 +58,27 @@ india = gpd.read_file(boundary_file)
 gdf = gpd.sjoin(gdf, india, predicate='within')
 
 # ----------------------------------------
-# Normalize the predicted pollution values
+# Pick the layers to draw; older prediction files only have the point estimate
 # ----------------------------------------
-gdf['norm_pred'] = gdf['predicted_light_pollution'] / gdf['predicted_light_pollution'].max()
+layers = [(column, label) for column, label in QUANTILE_LAYERS if column in gdf.columns]
+if not layers:
+    layers = [('predicted_light_pollution', 'Predicted')]
 
-# ----------------------------------------
-# Prepare heatmap data (latitude, longitude, intensity)
-# ----------------------------------------
-heat_data = [[row['Latitude'], row['Longitude'], row['norm_pred']] for idx, row in gdf.iterrows()]
+# Mean of every layer per heatmap cell, binned once from the forecast cells
+lat = gdf['Latitude'].to_numpy()
+lon = gdf['Longitude'].to_numpy()
+cells = {column: GridLevel(lat, lon, gdf[column].to_numpy(), cell_size(HEAT_MAX_ZOOM), (-90.0, -180.0))
+         for column, _ in layers}
+means = {column: level.weight / level.count for column, level in cells.items()}
+
+# Normalize every layer by the same maximum so the bands stay comparable
+scale = max(values.max() for values in means.values())
 
 # ----------------------------------------
 # Create the Folium map
 # ----------------------------------------
-m = folium.Map(location=[22.9734, 78.6569], zoom_start=5, tiles='CartoDB dark_matter')
+m = folium.Map(location=[22.9734, 78.6569], zoom_start=5, tiles=None)
+folium.TileLayer('CartoDB dark_matter', control=False).add_to(m)
 
 # Add geocoder/search bar
 Geocoder(collapsed=False, add_marker=True).add_to(m)
@@ -69,14 +93,23 @@ def style_function(feature):
 
 folium.GeoJson(boundary_file, name="India Border", style_function=style_function).add_to(m)
 
-# Add the heatmap layer
-HeatMap(
-    heat_data,
-    radius=15,
-    blur=10,
-    min_opacity=0.3,
-    max_zoom=6
-).add_to(m)
+# ----------------------------------------
+# Add one heatmap layer per quantile (latitude, longitude, intensity), median shown first
+# ----------------------------------------
+for column, label in layers:
+    level = cells[column]
+    heat_data = np.column_stack([level.lat, level.lon, means[column] / scale]).round(5).tolist()
+    layer = folium.FeatureGroup(name=label, overlay=False, show=column in ('predicted_p50', 'predicted_light_pollution'))
+    HeatMap(
+        heat_data,
+        radius=15,
+        blur=10,
+        min_opacity=0.3,
+        max_zoom=HEAT_MAX_ZOOM
+    ).add_to(layer)
+    layer.add_to(m)
+
+folium.LayerControl(collapsed=False).add_to(m)
 
 # Create output directory if it doesn't exist
 os.makedirs(os.path.dirname(output_file), exist_ok=True)